@@ -0,0 +1,133 @@
+"""Commission and heatmap analytics: NumPy group-bys vs. row-by-row Python.
+
+Seeds a throwaway database with several years of synthetic tickets, then computes
+per-technician commissions (with revenue and tips by payment type) and the weekday x
+hour revenue heatmap for a month, a year and the whole history. The baseline fetches
+the same rows and aggregates them in Python loops, the way payroll was done from the
+list endpoints. Loading (SQLite rows vs. NumPy columns) and computing are timed
+separately, and the two results are checked to agree.
+
+Usage (from backend/): python -m benchmarks.bench_analytics --years 5 --tickets-per-day 60
+"""
+import argparse
+import os
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=float, default=5)
+    parser.add_argument("--tickets-per-day", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the best is reported")
+    return parser.parse_args()
+
+def fetch_rows(from_day: str, to_day: str) -> tuple[list, list, list, dict]:
+    from service import analytics
+    from service.database import read_pool
+    from service.datetimes import epoch_range
+    start, end = epoch_range(from_day, to_day)
+    with read_pool.connection() as conn:
+        details = conn.execute(analytics.DETAILS_QUERY.format(schema="main"), (start, end)).fetchall()
+        payments = conn.execute(analytics.PAYMENTS_QUERY.format(schema="main"), (start, end)).fetchall()
+        works = conn.execute(analytics.WORKS_QUERY.format(schema="main"), (start, end)).fetchall()
+        employees = analytics.load_employees(conn)
+    return details, payments, works, employees
+
+def load_columns(from_day: str, to_day: str) -> tuple[list, list, list, dict]:
+    import numpy as np
+    from service import analytics
+    from service.database import read_pool
+    with read_pool.connection() as conn:
+        details = analytics.load_columns(conn, analytics.DETAILS_QUERY, from_day, to_day, (np.int64, np.int64, np.float64, np.float64))
+        payments = analytics.load_columns(conn, analytics.PAYMENTS_QUERY, from_day, to_day, (np.int64, np.float64, np.str_))
+        works = analytics.load_columns(conn, analytics.WORKS_QUERY, from_day, to_day, (np.int64, np.float64))
+        employees = analytics.load_employees(conn)
+    return details, payments, works, employees
+
+def python_commissions(details: list, payments: list, employees: dict) -> dict[int, dict]:
+    paid = defaultdict(lambda: defaultdict(float))
+    for work_id, amount, pmt_type in payments:
+        paid[work_id][pmt_type] += amount
+    work_weight, work_details = defaultdict(float), defaultdict(int)
+    for work_id, _, amount, tip in details:
+        work_weight[work_id] += amount + tip
+        work_details[work_id] += 1
+
+    lines = {}
+    for work_id, emp_id, amount, tip in details:
+        line = lines.setdefault(emp_id, {"details_count": 0, "emp_amount": 0.0, "emp_tip": 0.0, "revenue_by_type": defaultdict(float), "tips_by_type": defaultdict(float)})
+        line["details_count"] += 1
+        line["emp_amount"] += amount
+        line["emp_tip"] += tip
+        share = (amount + tip) / work_weight[work_id] if work_weight[work_id] > 0 else 1 / work_details[work_id]
+        work_paid = sum(paid[work_id].values())
+        for pmt_type, value in paid[work_id].items():
+            line["revenue_by_type"][pmt_type] += share * value
+            line["tips_by_type"][pmt_type] += tip * value / work_paid if work_paid > 0 else 0
+    for emp_id, line in lines.items():
+        _, work_percentage, cash_percentage, _ = employees.get(emp_id, ("", 0, 0, 0))
+        line["commission"] = round(line["emp_amount"] * work_percentage / 100, 2)
+        line["cash_pay"] = round(line["commission"] * cash_percentage / 100, 2)
+    return lines
+
+def python_heatmap(works: list) -> list[list[float]]:
+    from service import analytics
+    grid = [[0.0] * 24 for _ in range(7)]
+    for ts, grandtotal in works:
+        grid[(ts // 86400 + analytics.EPOCH_WEEKDAY) % 7][ts // 3600 % 24] += grandtotal
+    return grid
+
+def best_of(repeat: int, func, *args):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def agree(vectorized, rows) -> bool:
+    for line in vectorized:
+        expected = rows[line.emp_id]
+        if line.details_count != expected["details_count"] or abs(line.commission - expected["commission"]) > 0.01:
+            return False
+        if any(abs(v - expected["revenue_by_type"][t]) > 0.01 for t, v in line.revenue_by_type.items()):
+            return False
+        if any(abs(v - expected["tips_by_type"][t]) > 0.01 for t, v in line.tips_by_type.items()):
+            return False
+    return len(vectorized) == len(rows)
+
+def main():
+    args = parse_args()
+    # Configure the app's database before service.database reads the environment
+    os.environ['DATABASE_PATH'] = os.path.join(tempfile.mkdtemp(prefix="nails-bench-"), "analytics.db")
+    from benchmarks.seed import seed_database
+    from service import analytics, database
+
+    end = date.today()
+    summary = seed_database(os.environ['DATABASE_PATH'], years=args.years, tickets_per_day=args.tickets_per_day, end=end)
+    print(f"Seeded {summary['works']} works, {summary['details']} details, {summary['payments']} payments in {summary['seconds']} s")
+
+    database.startup()
+    try:
+        periods = {"month": (end - timedelta(days=30)).isoformat(), "year": (end - timedelta(days=365)).isoformat(), "all": summary["from_day"]}
+        print(f"{'':<8}{'fetch rows':>12}{'load cols':>12}  {'commissions py/np':>20}  {'heatmap py/np':>17}  (ms)")
+        for name, from_day in periods.items():
+            to_day = end.isoformat()
+            fetch_time, (details, payments, works, employees) = best_of(args.repeat, fetch_rows, from_day, to_day)
+            load_time, (detail_cols, pmt_cols, work_cols, _) = best_of(args.repeat, load_columns, from_day, to_day)
+
+            py_commissions, rows = best_of(args.repeat, python_commissions, details, payments, employees)
+            np_commissions, lines = best_of(args.repeat, analytics.commission_lines, *detail_cols[:4], *pmt_cols, employees)
+            py_heatmap, grid = best_of(args.repeat, python_heatmap, works)
+            np_heatmap, heatmap = best_of(args.repeat, analytics.revenue_heatmap, *work_cols, from_day, to_day)
+            same = agree(lines, rows) and all(abs(a - b) < 0.01 for row, expected in zip(heatmap.revenue, grid) for a, b in zip(row, expected))
+
+            print(f"{name:<8}{fetch_time * 1000:>12.1f}{load_time * 1000:>12.1f}  {py_commissions * 1000:>9.1f} /{np_commissions * 1000:>8.1f}"
+                  f"  {py_heatmap * 1000:>7.1f} /{np_heatmap * 1000:>7.1f}  {len(details)} details  agree={same}")
+    finally:
+        database.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Insert throughput of create_new_work: one commit per call vs. the group-commit writer.
+
+Concurrent callers insert works through DatabaseExecutor.insert() against a fresh,
+migrated database, first with per-call commits on the writer thread, then with a
+GroupCommitWriter batching them. Each run reports inserts/s, per-insert latency and
+how many writes shared a commit. Runs under synchronous=FULL by default, where every commit
+fsyncs; under NORMAL in WAL mode commits are cheap and batching mostly adds latency.
+
+Usage (from backend/): python -m benchmarks.bench_group_commit --callers 32 --inserts 5000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--callers", type=int, default=32, help="Concurrent inserting clients")
+    parser.add_argument("--inserts", type=int, default=5000, help="Inserts per mode")
+    parser.add_argument("--window-ms", type=float, default=2)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--synchronous", default="FULL", choices=("OFF", "NORMAL", "FULL"),
+                        help="PRAGMA synchronous for both runs; group commit only pays off when commits fsync")
+    return parser.parse_args()
+
+async def run(executor, callers: int, inserts: int) -> dict:
+    from service import works
+    latencies = []
+    remaining = iter(range(inserts))
+
+    async def caller():
+        for i in remaining:
+            work = works.Works(work_datetime=f"2026-01-01T{9 + i % 10:02d}:{i % 60:02d}:00", work_amount=40, work_tip=5, work_grandtotal=45, work_notes="bench")
+            start = time.perf_counter()
+            created = await executor.insert(works.create_new_work, work)
+            latencies.append(time.perf_counter() - start)
+            assert created.work_id != -1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(caller() for _ in range(callers)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {"inserts_per_s": inserts / elapsed, "p50_ms": statistics.median(latencies) * 1000,
+            "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000}
+
+def main():
+    args = parse_args()
+    # Configure the app's database before service.database reads the environment
+    os.environ['DATABASE_PATH'] = os.path.join(tempfile.mkdtemp(prefix="nails-bench-"), "group_commit.db")
+    os.environ['DB_SYNCHRONOUS'] = args.synchronous
+    os.environ['DB_GROUP_COMMIT'] = '0'
+    from service import database, metrics
+
+    database.startup()
+    try:
+        print(f"{args.inserts} inserts from {args.callers} callers, synchronous={args.synchronous}")
+        for mode in ("per-call", "group"):
+            if mode == "group":
+                database.executor.group_writer = database.GroupCommitWriter(database.write_pool, args.window_ms / 1000, args.max_batch)
+            result = asyncio.run(run(database.executor, args.callers, args.inserts))
+            line = f"{mode:<10}{result['inserts_per_s']:>10.0f} inserts/s  p50 {result['p50_ms']:7.2f} ms  p99 {result['p99_ms']:7.2f} ms"
+            series = metrics.group_commit_size._series.get(())
+            if mode == "group" and series:
+                line += f"  {series[2]} commits, {series[1] / series[2]:.1f} writes each"
+            print(line)
+        with database.write_pool.connection() as conn:
+            print(f"rows written: {conn.execute('SELECT COUNT(*) FROM works').fetchone()[0]}")
+    finally:
+        database.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""Mixed-workload load test for the API: latency percentiles and throughput per operation.
+
+Seeds (or reuses) a local SQLite database, then drives the app with concurrent clients
+either in-process through httpx's ASGI transport or over HTTP against uvicorn. Results
+are printed as a table and can be written as JSON to compare runs between commits.
+
+Usage (from backend/):
+    python -m benchmarks.bench_load --workload mixed --concurrency 16 --seconds 10 --out before.json
+    python -m benchmarks.bench_load --target uvicorn --workers 4 --baseline before.json
+    python -m benchmarks.bench_load --url http://127.0.0.1:8000 --workload roster
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import httpx
+
+# Workload name -> {operation: weight}
+WORKLOADS = {
+    "mixed": {"checkout": 20, "checkout_burst": 2, "daily_report": 8, "payroll_report": 4,
+              "works_range": 10, "roster": 30, "employee": 16, "work": 10},
+    "checkout": {"checkout": 80, "checkout_burst": 20},
+    "reports": {"daily_report": 40, "payroll_report": 30, "works_range": 30},
+    "roster": {"roster": 70, "employee": 30},
+}
+
+class Context:
+    """What the operations need to know about the seeded data."""
+    def __init__(self, from_day: date, to_day: date, emp_ids: list[int], max_work_id: int):
+        self.from_day = from_day
+        self.to_day = to_day
+        self.emp_ids = emp_ids
+        self.max_work_id = max_work_id
+
+    def random_day(self, rng: random.Random, span: int = 0) -> tuple[date, date]:
+        days = max(0, (self.to_day - self.from_day).days - span)
+        first = self.from_day + timedelta(days=rng.randint(0, days))
+        return first, first + timedelta(days=span)
+
+def random_ticket(rng: random.Random, ctx: Context) -> dict:
+    # Imported late: benchmarks.seed pulls in service.database, which must see DATABASE_PATH first
+    from benchmarks.seed import random_ticket as seed_ticket
+    work, details, payments = seed_ticket(rng, ctx.to_day, ctx.emp_ids)
+    return {
+        "work": dict(zip(("work_datetime", "work_amount", "work_tip", "work_discount", "work_grandtotal", "work_notes"), work)),
+        "details": [{"emp_id": e, "emp_amount": a, "emp_tip": t, "detail_notes": n} for e, a, t, n in details],
+        "payments": [{"pmt_amount": a, "pmt_type": t} for a, t in payments],
+    }
+
+async def op_checkout(client: httpx.AsyncClient, rng: random.Random, ctx: Context):
+    return await client.post("/tickets/new_ticket", json=random_ticket(rng, ctx))
+
+async def op_checkout_burst(client: httpx.AsyncClient, rng: random.Random, ctx: Context):
+    return await client.post("/tickets/new_tickets", json=[random_ticket(rng, ctx) for _ in range(rng.randint(5, 20))])
+
+async def op_daily_report(client: httpx.AsyncClient, rng: random.Random, ctx: Context):
+    first, last = ctx.random_day(rng, 30)
+    return await client.get(f"/reports/daily/{first}/{last}")
+
+async def op_payroll_report(client: httpx.AsyncClient, rng: random.Random, ctx: Context):
+    first, last = ctx.random_day(rng, 13)
+    return await client.get(f"/reports/payroll/{first}/{last}")
+
+async def op_works_range(client: httpx.AsyncClient, rng: random.Random, ctx: Context):
+    first, _ = ctx.random_day(rng)
+    return await client.get(f"/works/between-dates/{first} 00:00:00/{first} 23:59:59")
+
+async def op_roster(client: httpx.AsyncClient, rng: random.Random, ctx: Context):
+    return await client.get("/employees/all_employees")
+
+async def op_employee(client: httpx.AsyncClient, rng: random.Random, ctx: Context):
+    return await client.get(f"/employees/by-id/{rng.choice(ctx.emp_ids)}")
+
+async def op_work(client: httpx.AsyncClient, rng: random.Random, ctx: Context):
+    return await client.get(f"/works/by-id/{rng.randint(1, ctx.max_work_id)}")
+
+OPERATIONS = {
+    "checkout": op_checkout,
+    "checkout_burst": op_checkout_burst,
+    "daily_report": op_daily_report,
+    "payroll_report": op_payroll_report,
+    "works_range": op_works_range,
+    "roster": op_roster,
+    "employee": op_employee,
+    "work": op_work,
+}
+
+def percentile(ordered: list[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+def summarize(latencies: list[float], errors: int, seconds: float) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "rps": round(len(ordered) / seconds, 1) if seconds else 0.0,
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+    }
+
+async def run_workload(client: httpx.AsyncClient, ctx: Context, mix: dict[str, int], concurrency: int,
+                       seconds: float, warmup: float, seed: int) -> dict:
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    latencies: dict[str, list[float]] = {name: [] for name in names}
+    errors: dict[str, int] = {name: 0 for name in names}
+    measure_from = time.perf_counter() + warmup
+    stop_at = measure_from + seconds
+
+    async def worker(index: int):
+        rng = random.Random(seed * 1000 + index)
+        while (now := time.perf_counter()) < stop_at:
+            name = rng.choices(names, weights)[0]
+            try:
+                response = await OPERATIONS[name](client, rng, ctx)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            elapsed = time.perf_counter() - now
+            if now >= measure_from:
+                latencies[name].append(elapsed)
+                errors[name] += failed
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    everything = [value for values in latencies.values() for value in values]
+    return {
+        "overall": summarize(everything, sum(errors.values()), seconds),
+        "operations": {name: summarize(latencies[name], errors[name], seconds) for name in names if latencies[name]},
+    }
+
+def load_context(path: str) -> Context:
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        first, last = conn.execute("SELECT MIN(day), MAX(day) FROM daily_totals WHERE day != ''").fetchone()
+        emp_ids = [row[0] for row in conn.execute("SELECT emp_id FROM employees ORDER BY emp_id")]
+        max_work_id = conn.execute("SELECT COALESCE(MAX(work_id), 1) FROM works").fetchone()[0]
+    finally:
+        conn.close()
+    if not first or not emp_ids:
+        raise SystemExit(f"{path} has no works or employees, run again with --reseed")
+    return Context(date.fromisoformat(first), date.fromisoformat(last), emp_ids, max_work_id)
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_uvicorn(db_path: str, workers: int) -> tuple[subprocess.Popen, str]:
+    port = free_port()
+    # WEB_CONCURRENCY makes each worker size its pools for its share of the machine
+    env = {**os.environ, "DATABASE_PATH": db_path, "WEB_CONCURRENCY": str(workers)}
+    process = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+                                "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+                               cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), env=env)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"uvicorn exited with status {process.returncode}")
+        try:
+            if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("uvicorn did not become healthy within 30 s")
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_report(result: dict, baseline: dict | None = None):
+    print(f"{'operation':<16}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    rows = list(result["operations"].items()) + [("overall", result["overall"])]
+    for name, stats in rows:
+        line = f"{name:<16}{stats['requests']:>10}{stats['errors']:>8}{stats['rps']:>10}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}"
+        before = (baseline or {}).get("overall" if name == "overall" else "operations", {})
+        before = before if name == "overall" else before.get(name)
+        if before and before.get("p95_ms") and before.get("rps"):
+            line += f"   p95 {(stats['p95_ms'] / before['p95_ms'] - 1) * 100:+6.1f}%  req/s {(stats['rps'] / before['rps'] - 1) * 100:+6.1f}%"
+        print(line)
+
+async def drive(base_url: str | None, ctx: Context, args) -> dict:
+    workload = WORKLOADS[args.workload]
+    if base_url:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+            return await run_workload(client, ctx, workload, args.concurrency, args.seconds, args.warmup, args.seed)
+    from main import app
+    # ASGITransport does not send lifespan events, so open the app's pools here
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=30) as client:
+            return await run_workload(client, ctx, workload, args.concurrency, args.seconds, args.warmup, args.seed)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "nails-bench.db"), help="Benchmark database (seeded if missing)")
+    parser.add_argument("--reseed", action="store_true", help="Delete and re-seed --db before running")
+    parser.add_argument("--years", type=float, default=3)
+    parser.add_argument("--tickets-per-day", type=int, default=60)
+    parser.add_argument("--workload", choices=sorted(WORKLOADS), default="mixed")
+    parser.add_argument("--target", choices=("asgi", "uvicorn"), default="asgi", help="In-process ASGI or a spawned uvicorn server")
+    parser.add_argument("--url", help="Benchmark an already running server instead (its database is not touched)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes for --target uvicorn")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--warmup", type=float, default=1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    db_path = os.path.abspath(args.db)
+    if not args.url:
+        if args.reseed:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(db_path + suffix):
+                    os.remove(db_path + suffix)
+        # Point the app at the benchmark database before anything imports service.database
+        os.environ['DATABASE_PATH'] = db_path
+        if not os.path.exists(db_path):
+            from benchmarks.seed import seed_database
+            summary = seed_database(db_path, args.years, args.tickets_per_day, seed=args.seed)
+            print(f"Seeded {summary['works']} works, {summary['details']} details, {summary['payments']} payments in {summary['seconds']} s")
+    ctx = load_context(db_path) if not args.url else None
+    if ctx is None:
+        # Against an external server, learn the data layout through the API
+        roster = httpx.get(f"{args.url}/employees/all_employees", timeout=10).json()
+        today = date.today()
+        ctx = Context(today - timedelta(days=365), today, [e["emp_id"] for e in roster] or [1], 1)
+
+    process = None
+    base_url = args.url
+    if not base_url and args.target == "uvicorn":
+        process, base_url = start_uvicorn(db_path, args.workers)
+    try:
+        result = asyncio.run(drive(base_url, ctx, args))
+    finally:
+        if process:
+            process.terminate()
+            process.wait(timeout=10)
+
+    target = args.url or ("uvicorn" if process else "asgi")
+    result["meta"] = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "target": target,
+        "workers": args.workers if process else None,
+        "workload": args.workload,
+        "concurrency": args.concurrency,
+        "seconds": args.seconds,
+        "database": None if args.url else db_path,
+    }
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    print(f"{args.workload} workload, {target}, {args.concurrency} clients, {args.seconds:g} s (commit {result['meta']['commit']})")
+    print_report(result, baseline)
+    if args.out:
+        with open(args.out, "w") as file:
+            json.dump(result, file, indent=2)
+        print(f"Results written to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Serialization cost of a large works response: validated models vs. the trusted fast path.
+
+The "validated" route rebuilds every row through Works(...) and returns the list with a
+`-> list[Works]` annotation, so FastAPI validates and serializes it again (the old path).
+The "fast" route decodes rows with list_to_works (plain dicts) and serializes them once
+with main.fast_json.
+
+Usage (from backend/): python -m benchmarks.bench_serialization --rows 100000
+"""
+import argparse
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from service import works
+
+def build_app(rows: list[tuple]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/validated")
+    def validated() -> list[works.Works]:
+        return [works.Works(work_id=r[0], work_datetime=r[1], work_amount=r[2], work_tip=r[3], work_discount=r[4], work_grandtotal=r[5], work_notes=r[6]) for r in rows]
+
+    @app.get("/fast")
+    def fast():
+        from main import fast_json
+        return fast_json(works.list_to_works(rows))
+
+    return app
+
+def timed(client: TestClient, path: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(path)
+        best = min(best, time.perf_counter() - start)
+        response.raise_for_status()
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = [(i, "2025-01-01T10:00:00", 45.0, 8.0, 0.0, 53.0, "gel manicure") for i in range(1, args.rows + 1)]
+    client = TestClient(build_app(rows))
+    validated = timed(client, "/validated", args.repeat)
+    fast = timed(client, "/fast", args.repeat)
+    print(f"{args.rows} works  validated: {validated * 1000:8.1f} ms  fast: {fast * 1000:8.1f} ms  speedup: {validated / fast:4.1f}x")
+
+if __name__ == "__main__":
+    main()
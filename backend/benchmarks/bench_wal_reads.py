@@ -0,0 +1,96 @@
+"""Concurrent read throughput while a writer is busy: rollback journal vs. WAL profile.
+
+Seeds a throwaway database, then runs reader threads issuing date-range queries
+against the read pool while one thread keeps inserting works through the writer.
+
+Usage (from backend/): python -m benchmarks.bench_wal_reads --readers 8 --seconds 5
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+_scratch = tempfile.mkdtemp(prefix="nails-bench-")
+
+from service.database import ConnectionPool, ConnectionProfile
+
+SCHEMA = """
+CREATE TABLE works(
+    work_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    work_datetime TEXT,
+    work_amount REAL,
+    work_tip REAL,
+    work_discount REAL,
+    work_grandtotal REAL,
+    work_notes TEXT
+);
+"""
+
+def seed(path: str, rows: int):
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    conn.executemany("INSERT INTO works(work_datetime, work_amount, work_tip, work_discount, work_grandtotal, work_notes) VALUES(?, ?, ?, ?, ?, ?)",
+                     ((f"2024-{random.randint(1, 12):02d}-{random.randint(1, 28):02d} 10:00:00", 50, 10, 0, 60, "seed") for _ in range(rows)))
+    conn.commit()
+    conn.close()
+
+def run(profile: ConnectionProfile, readers: int, seconds: float, rows: int) -> dict:
+    path = os.path.join(_scratch, f"{profile.journal_mode.lower()}.db")
+    seed(path, rows)
+    write_pool = ConnectionPool(1, path, profile=profile)
+    read_pool = ConnectionPool(readers, path, profile=profile, readonly=True)
+    stop = threading.Event()
+    reads, writes, errors = [0] * readers, [0], [0]
+
+    def reader(slot: int):
+        while not stop.is_set():
+            month = random.randint(1, 12)
+            try:
+                with read_pool.connection() as conn:
+                    conn.execute("SELECT * FROM works WHERE work_datetime BETWEEN ? AND ?",
+                                 (f"2024-{month:02d}-01", f"2024-{month:02d}-31")).fetchall()
+                reads[slot] += 1
+            except sqlite3.OperationalError:
+                errors[0] += 1
+
+    def writer():
+        while not stop.is_set():
+            try:
+                with write_pool.connection() as conn:
+                    conn.execute("INSERT INTO works(work_datetime, work_amount, work_tip, work_discount, work_grandtotal, work_notes) VALUES(?, ?, ?, ?, ?, ?)",
+                                 ("2024-06-15 12:00:00", 40, 5, 0, 45, "bench"))
+                    conn.commit()
+                writes[0] += 1
+            except sqlite3.OperationalError:
+                errors[0] += 1
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)] + [threading.Thread(target=writer)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    return {"journal_mode": profile.journal_mode, "reads_per_sec": sum(reads) / seconds,
+            "writes_per_sec": writes[0] / seconds, "errors": errors[0]}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--rows", type=int, default=50_000)
+    args = parser.parse_args()
+
+    # The rollback-journal baseline mirrors the old plain sqlite3.connect() handles
+    baseline = ConnectionProfile(journal_mode="DELETE", synchronous="FULL", mmap_size=0, cache_size=-2000, temp_store="DEFAULT")
+    for profile in (baseline, ConnectionProfile()):
+        result = run(profile, args.readers, args.seconds, args.rows)
+        print(f"{result['journal_mode']:>7}: {result['reads_per_sec']:10.1f} reads/s  "
+              f"{result['writes_per_sec']:8.1f} writes/s  {result['errors']} lock errors")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Synthetic salon data for benchmarks: years of works with their details and payments.
+
+The target database is migrated to the current schema first, so the rollup triggers,
+indexes and any later tables are exercised exactly as in production. Generation is
+deterministic for a given --seed.
+
+Usage (from backend/): python -m benchmarks.seed /tmp/nails-bench.db --years 3 --tickets-per-day 60
+"""
+import argparse
+import random
+import sqlite3
+import time
+from datetime import date, datetime, timedelta
+
+from service.database import MIGRATIONS, run_migrations
+
+SERVICES = (("manicure", 25), ("gel manicure", 40), ("pedicure", 35), ("spa pedicure", 55),
+            ("acrylic full set", 60), ("acrylic fill", 40), ("dip powder", 45), ("nail art", 15))
+PAYMENT_TYPES = ("cash", "card", "card", "card", "check", "gift")
+FIRST_NAMES = ("Anna", "Binh", "Chau", "Diana", "Emily", "Hoa", "Kim", "Linh", "Mai", "Ngoc", "Tam", "Vy")
+
+def random_employee(rng: random.Random, index: int) -> tuple:
+    return (f"{FIRST_NAMES[index % len(FIRST_NAMES)]} {index + 1}", f"555{rng.randint(0, 9999999):07d}", f"{rng.randint(0, 999999999):09d}",
+            f"{rng.randint(1, 9999)} Main St", rng.choice((50, 55, 60, 65, 70)), rng.choice((0, 30, 50, 70, 100)), 0)
+
+def random_ticket(rng: random.Random, day: date, emp_ids: list[int]) -> tuple[tuple, list[tuple], list[tuple]]:
+    """One checkout as (work, details, payments) rows without their keys."""
+    opened = datetime(day.year, day.month, day.day, 9) + timedelta(minutes=rng.randint(0, 11 * 60))
+    details = []
+    for emp_id in rng.sample(emp_ids, k=min(len(emp_ids), rng.choice((1, 1, 1, 2, 2, 3)))):
+        name, price = rng.choice(SERVICES)
+        details.append((emp_id, float(price), float(rng.choice((0, 3, 5, 8, 10))), name))
+    amount = sum(d[1] for d in details)
+    tip = sum(d[2] for d in details)
+    discount = float(rng.choice((0, 0, 0, 0, 5, 10)))
+    grandtotal = amount + tip - min(discount, amount)
+    work = (opened.isoformat(timespec="seconds"), amount, tip, discount, grandtotal, "seed")
+
+    if grandtotal > 0 and rng.random() < 0.2:
+        split = round(grandtotal * rng.uniform(0.2, 0.8), 2)
+        payments = [(split, rng.choice(PAYMENT_TYPES)), (round(grandtotal - split, 2), rng.choice(PAYMENT_TYPES))]
+    else:
+        payments = [(grandtotal, rng.choice(PAYMENT_TYPES))]
+    return work, details, payments
+
+def seed_database(path: str, years: float = 3, tickets_per_day: int = 60, employees: int = 10,
+                  end: date | None = None, seed: int = 42) -> dict:
+    """Fill the database at path and return a summary of what was written."""
+    rng = random.Random(seed)
+    end = end or date.today()
+    days = max(1, int(years * 365))
+    start = end - timedelta(days=days - 1)
+
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    run_migrations(conn, MIGRATIONS)
+    conn.execute("PRAGMA synchronous=OFF")
+    started = time.perf_counter()
+
+    conn.execute("BEGIN")
+    cursor = conn.cursor()
+    emp_ids = []
+    for index in range(employees):
+        cursor.execute("INSERT INTO employees(emp_name, emp_phone, emp_ssn, emp_address, emp_work_percentage, emp_cash_percentage, emp_salary) VALUES(?, ?, ?, ?, ?, ?, ?)",
+                       random_employee(rng, index))
+        emp_ids.append(cursor.lastrowid)
+
+    # Keys are assigned here so a whole day can go in with three executemany() calls
+    next_work = (conn.execute("SELECT MAX(work_id) FROM works").fetchone()[0] or 0) + 1
+    next_detail = (conn.execute("SELECT MAX(detail_id) FROM emp_work_detail").fetchone()[0] or 0) + 1
+    next_pmt = (conn.execute("SELECT MAX(pmt_id) FROM payments").fetchone()[0] or 0) + 1
+    totals = {"works": 0, "details": 0, "payments": 0}
+
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        # Weekends are busier, and the shop is closed most Mondays
+        volume = tickets_per_day * (1.4 if day.weekday() >= 5 else 0.2 if day.weekday() == 0 else 1.0)
+        work_rows, detail_rows, pmt_rows = [], [], []
+        for _ in range(max(0, int(rng.gauss(volume, volume * 0.15)))):
+            work, details, payments = random_ticket(rng, day, emp_ids)
+            work_rows.append((next_work, *work))
+            for emp_id, emp_amount, emp_tip, notes in details:
+                detail_rows.append((next_detail, next_work, emp_id, emp_amount, emp_tip, notes))
+                next_detail += 1
+            for pmt_amount, pmt_type in payments:
+                pmt_rows.append((next_pmt, next_work, pmt_amount, pmt_type))
+                next_pmt += 1
+            next_work += 1
+
+        cursor.executemany("INSERT INTO works(work_id, work_datetime, work_amount, work_tip, work_discount, work_grandtotal, work_notes) VALUES(?, ?, ?, ?, ?, ?, ?)", work_rows)
+        cursor.executemany("INSERT INTO emp_work_detail(detail_id, work_id, emp_id, emp_amount, emp_tip, detail_notes) VALUES(?, ?, ?, ?, ?, ?)", detail_rows)
+        cursor.executemany("INSERT INTO payments(pmt_id, work_id, pmt_amount, pmt_type) VALUES(?, ?, ?, ?)", pmt_rows)
+        totals["works"] += len(work_rows)
+        totals["details"] += len(detail_rows)
+        totals["payments"] += len(pmt_rows)
+
+    conn.execute("COMMIT")
+    conn.execute("PRAGMA optimize")
+    conn.close()
+
+    return {"path": path, "from_day": start.isoformat(), "to_day": end.isoformat(), "employees": employees,
+            **totals, "seconds": round(time.perf_counter() - started, 2)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="SQLite file to create or extend")
+    parser.add_argument("--years", type=float, default=3)
+    parser.add_argument("--tickets-per-day", type=int, default=60)
+    parser.add_argument("--employees", type=int, default=10)
+    parser.add_argument("--end", type=date.fromisoformat, default=None, help="Last seeded day (default: today)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    summary = seed_database(args.path, args.years, args.tickets_per_day, args.employees, args.end, args.seed)
+    print(f"Seeded {summary['works']} works, {summary['details']} details, {summary['payments']} payments "
+          f"({summary['from_day']} .. {summary['to_day']}) into {summary['path']} in {summary['seconds']} s")
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,16 @@
-from fastapi import FastAPI, Query, HTTPException, status
-from service import employees, works, payments, emp_work_detail
+from fastapi import FastAPI, Header, Query, HTTPException, Request, Response, status
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
+from pydantic_core import to_json
+from service import employees, works, payments, emp_work_detail, tickets, reports, metrics, archive, events, idempotency, search, export, analytics
+from service import database
+from service.database import backups, executor, health, parse_ids, select_table_versions
+from service.cache import etag_matches, versions_etag
+from service.compression import CompressionMiddleware
+from contextlib import asynccontextmanager
+import asyncio
 import logging
+import os
+import time
 
 # Configure logging
 logging.basicConfig(
@@ -9,55 +19,192 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Each uvicorn worker opens its own pools on startup, not at import
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    database.startup()
+    yield
+    database.shutdown()
+
 # run the program with this command: py -m uvicorn main:app --reload
+# or, using several cores: WEB_CONCURRENCY=4 py -m uvicorn main:app
 app = FastAPI(
     title="Nails Salon API",
     description="API for managing salon employees, works, payments, and work details",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# gzip (or brotli, when installed) for responses of at least COMPRESSION_MIN_SIZE bytes
+app.add_middleware(CompressionMiddleware, minimum_size=int(os.getenv('COMPRESSION_MIN_SIZE', '1024')),
+                   compresslevel=int(os.getenv('GZIP_LEVEL', '6')), brotli_quality=int(os.getenv('BROTLI_QUALITY', '4')))
+
+##### Instrumentation #####
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        # Label by route template (/works/by-id/{work_id}), not the raw path, to bound cardinality
+        route = request.scope.get("route")
+        metrics.request_latency.observe(time.perf_counter() - start, request.method, route.path if route else "unmatched", status_code)
+
+@app.get("/metrics", tags=["Health"], response_class=PlainTextResponse)
+async def get_metrics() -> PlainTextResponse:
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+##### Instrumentation #####
+
+##### Pagination & streaming helpers #####
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+def fast_json(rows: list[dict], response: Response | None = None) -> Response:
+    # List reads return trusted row dicts: serialize them once in pydantic-core instead of
+    # letting FastAPI validate every row against the declared return type
+    headers = {k: v for k, v in response.headers.items() if k != "content-length"} if response is not None else None
+    return Response(content=to_json(rows), media_type="application/json", headers=headers)
+
+NOT_MODIFIED = object()
+
+def versioned_read(tables: tuple[str, ...], key: str, if_none_match: str | None, func, *args):
+    # Runs on the read executor, so the version check and the query share one thread hop.
+    # Versions are read first: a write landing in between can only make the ETag stale
+    # (forcing a 200 next time), never make it claim data the client has not seen.
+    etag = versions_etag(select_table_versions(tables), key)
+    if etag_matches(if_none_match, etag):
+        return etag, NOT_MODIFIED
+    return etag, func(*args)
+
+async def conditional_read(request: Request, tables: tuple[str, ...], func, *args):
+    """Return (etag, result); result is NOT_MODIFIED when the client's copy is still current."""
+    key = f"{request.url.path}?{request.url.query}"
+    return await executor.read(versioned_read, tables, key, request.headers.get("if-none-match"), func, *args)
+
+async def idempotent_write(request: Request, status_code: int, succeeded, func, payload):
+    """Run a create through service.idempotency when the client sent an Idempotency-Key."""
+    key = request.headers.get("idempotency-key")
+    if key is None:
+        return await executor.insert(func, payload)
+    try:
+        # Replays from the in-memory LRU are answered here instead of waiting behind queued writes
+        stored = idempotency.lookup(key, request.url.path, payload)
+        if stored is None:
+            result, stored = await executor.write(idempotency.run_once, key, request.url.path, payload, status_code, succeeded, func, payload)
+    except idempotency.IdempotencyError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    if stored is not None:
+        return Response(content=stored.body, status_code=stored.status_code, media_type="application/json", headers={"Idempotent-Replayed": "true"})
+    return result
+
+def set_next_cursor(response: Response, rows: list, limit: int | None, id_field: str):
+    # A full page means there may be more rows: hand back the keyset cursor for the next call
+    if limit and len(rows) == limit:
+        response.headers["X-Next-Cursor"] = str(rows[-1][id_field])
+
+async def ndjson_batches(batches):
+    # Pull one fetchmany() batch at a time on the read executor and serialize it as it arrives
+    try:
+        while True:
+            batch = await executor.read(next, batches, None)
+            if batch is None:
+                break
+            yield b"".join(to_json(row) + b"\n" for row in batch)
+    finally:
+        await executor.read(batches.close)
+
+def ndjson_response(batches) -> StreamingResponse:
+    return StreamingResponse(ndjson_batches(batches), media_type="application/x-ndjson")
+
+async def executor_chunks(chunks):
+    # Like ndjson_batches for generators that already yield bytes: the scan and the encoding
+    # both run on the read executor, one chunk per hop
+    try:
+        while True:
+            chunk = await executor.read(next, chunks, None)
+            if chunk is None:
+                break
+            yield chunk
+    finally:
+        await executor.read(chunks.close)
+##### Pagination & streaming helpers #####
+
+##### Health #####
+@app.get("/health", tags=["Health"])
+async def get_health() -> dict:
+    try:
+        return await executor.read(health)
+    except Exception as e:
+        logger.error(f"Database health check failed: {e}")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database unavailable")
+##### Health #####
+
 ##### APIs for Employees #####
 @app.get("/employees/all_employees", tags=["Employees"])
-def get_all_employees() -> list[employees.Employee]:
+async def get_all_employees(request: Request, response: Response, after_id: int = 0, limit: int | None = Query(None, ge=1), stream: bool = False) -> list[employees.Employee]:
     try:
-        return employees.select_all_employees()
+        if stream:
+            return ndjson_response(employees.iter_all_employees(after_id, limit))
+        # Answer revalidations straight from the roster cache, without touching the database
+        etag = employees.all_employees_etag(after_id, limit)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return not_modified(etag)
+        result = await executor.read(employees.select_all_employees, after_id, limit)
+        etag = employees.all_employees_etag(after_id, limit)
+        if etag:
+            response.headers["ETag"] = etag
+        set_next_cursor(response, result, limit, "emp_id")
+        return fast_json(result, response)
     except Exception as e:
         logger.error(f"Error fetching employees: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error fetching employees")
 
 @app.get("/employees/by-id/{emp_id}", tags=["Employees"])
-def get_employee_id(emp_id: int) -> employees.Employee:
-    emp = employees.select_employee_id(emp_id)
+async def get_employee_id(emp_id: int, request: Request, response: Response) -> employees.Employee:
+    etag = employees.employee_etag(emp_id)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    emp = await executor.read(employees.select_employee_id, emp_id)
     if emp.emp_id == -1:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Employee {emp_id} not found")
+    etag = employees.employee_etag(emp_id)
+    if etag:
+        response.headers["ETag"] = etag
     return emp
 
 @app.post("/employees/new_employee", status_code=status.HTTP_201_CREATED, tags=["Employees"])
-def post_employee(new_emp: employees.Employee) -> employees.Employee:
+async def post_employee(new_emp: employees.Employee) -> employees.Employee:
     try:
-        return employees.create_new_employee(new_emp)
+        return await executor.write(employees.create_new_employee, new_emp)
     except Exception as e:
         logger.error(f"Error creating employee: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error creating employee")
 
 @app.put("/employees/update_employee", tags=["Employees"])
-def put_employee(exist_emp: employees.Employee) -> employees.Employee:
+async def put_employee(exist_emp: employees.Employee) -> employees.Employee:
     try:
-        result = employees.update_existing_employee(exist_emp)
+        result = await executor.write(employees.update_existing_employee, exist_emp)
         if result.emp_id == -1:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Employee {exist_emp.emp_id} not found")
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error updating employee: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error updating employee")
 
 @app.delete("/employees/delete_employee/{emp_id}", status_code=status.HTTP_200_OK, tags=["Employees"])
-def delete_employee(emp_id: int) -> employees.Employee:
+async def delete_employee(emp_id: int) -> employees.Employee:
     try:
-        result = employees.delete_existing_employee(emp_id)
+        result = await executor.write(employees.delete_existing_employee, emp_id)
         if result.emp_id == -1:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Employee {emp_id} not found")
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error deleting employee: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error deleting employee")
@@ -65,57 +212,76 @@ def delete_employee(emp_id: int) -> employees.Employee:
 
 ##### APIs for Works #####
 @app.get("/works/all_works", tags=["Works"])
-def get_all_works() -> list[works.Works]:
+async def get_all_works(request: Request, response: Response, after_id: int = 0, limit: int | None = Query(None, ge=1), stream: bool = False) -> list[works.Works]:
     try:
-        return works.select_all_works()
+        if stream:
+            return ndjson_response(works.iter_all_works(after_id, limit))
+        etag, result = await conditional_read(request, ("works",), works.select_all_works, after_id, limit)
+        if result is NOT_MODIFIED:
+            return not_modified(etag)
+        response.headers["ETag"] = etag
+        set_next_cursor(response, result, limit, "work_id")
+        return fast_json(result, response)
     except Exception as e:
         logger.error(f"Error fetching works: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error fetching works")
 
 @app.get("/works/by-id/{work_id}", tags=["Works"])
-def get_work_id(work_id: int) -> works.Works:
-    work = works.select_work_id(work_id)
+async def get_work_id(work_id: int) -> works.Works:
+    work = await executor.read(works.select_work_id, work_id)
     if work.work_id == -1:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Work {work_id} not found")
     return work
     
 # GET works between 2 datetime
 @app.get("/works/between-dates/{from_datetime}/{to_datetime}", tags=["Works"])
-def get_works_date(from_datetime: str, to_datetime: str) -> list[works.Works]:
+async def get_works_date(from_datetime: str, to_datetime: str, request: Request, response: Response) -> list[works.Works]:
     try:
-        return works.select_works_between_dates(from_datetime, to_datetime)
+        etag, result = await conditional_read(request, ("works",), works.select_works_between_dates, from_datetime, to_datetime)
+        if result is NOT_MODIFIED:
+            return not_modified(etag)
+        response.headers["ETag"] = etag
+        return fast_json(result, response)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching works between dates: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error fetching works")
 
 # POST new work
 @app.post("/works/new_work", status_code=status.HTTP_201_CREATED, tags=["Works"])
-def post_work(new_work: works.Works) -> works.Works:
+async def post_work(new_work: works.Works, request: Request) -> works.Works:
     try:
-        return works.create_new_work(new_work)
+        return await idempotent_write(request, status.HTTP_201_CREATED, lambda w: w.work_id != -1, works.create_new_work, new_work)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error creating work: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error creating work")
 
 # Update existing work
 @app.put("/works/update_work", tags=["Works"])
-def put_work(exist_work: works.Works) -> works.Works:
+async def put_work(exist_work: works.Works) -> works.Works:
     try:
-        result = works.update_existing_work(exist_work)
+        result = await executor.write(works.update_existing_work, exist_work)
         if result.work_id == -1:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Work {exist_work.work_id} not found")
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error updating work: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error updating work")
 
 @app.delete("/works/delete_work/{work_id}", status_code=status.HTTP_200_OK, tags=["Works"])
-def delete_work(work_id: int) -> works.Works:
+async def delete_work(work_id: int) -> works.Works:
     try:
-        result = works.delete_existing_work(work_id)
+        result = await executor.write(works.delete_existing_work, work_id)
         if result.work_id == -1:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Work {work_id} not found")
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error deleting work: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error deleting work")
@@ -123,62 +289,298 @@ def delete_work(work_id: int) -> works.Works:
 
 ##### APIs for Employee Work Details #####
 @app.get("/details/all_details", tags=["Employee Work Details"])
-def get_all_details() -> list[emp_work_detail.Detail]:
-    return emp_work_detail.select_all_detail()
+async def get_all_details(request: Request, response: Response, after_id: int = 0, limit: int | None = Query(None, ge=1), stream: bool = False) -> list[emp_work_detail.Detail]:
+    if stream:
+        return ndjson_response(emp_work_detail.iter_all_detail(after_id, limit))
+    etag, result = await conditional_read(request, ("emp_work_detail",), emp_work_detail.select_all_detail, after_id, limit)
+    if result is NOT_MODIFIED:
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    set_next_cursor(response, result, limit, "detail_id")
+    return fast_json(result, response)
 
 @app.get("/details/by-id/{work_id}", tags=["Employee Work Details"])
-def get_detail_id(work_id: int) -> emp_work_detail.Detail:
-    return emp_work_detail.select_detail_id(work_id)
+async def get_detail_id(work_id: int) -> emp_work_detail.Detail:
+    return await executor.read(emp_work_detail.select_detail_id, work_id)
+
+def parse_id_list(ids: str | None) -> list[int]:
+    try:
+        return parse_ids(ids)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid id list: {ids}")
 
-# GET detail by list of work_ids
+# GET detail by list of work_ids (1-2-3 or 1,2,3)
 @app.get("/details/by-workids", tags=["Employee Work Details"])
-def get_details_workid_list(work_ids: str = Query(None)) -> list[emp_work_detail.Detail]:
-    return emp_work_detail.select_detail_workdids(work_ids)
+async def get_details_workid_list(work_ids: str = Query(None)) -> list[emp_work_detail.Detail]:
+    return fast_json(await executor.read(emp_work_detail.select_detail_workdids, parse_id_list(work_ids)))
+
+# POST variant for id lists too long for a URL
+@app.post("/details/by-workids", tags=["Employee Work Details"])
+async def post_details_workid_list(request: emp_work_detail.WorkIdsRequest) -> list[emp_work_detail.Detail]:
+    return fast_json(await executor.read(emp_work_detail.select_detail_workdids, list(dict.fromkeys(request.work_ids))))
 
 # GET details by emp_id and list of work_ids
 @app.get("/details/by-empid/{emp_id}", tags=["Employee Work Details"])
-def get_detail_empid_workids(emp_id: int, work_ids: str = Query(None)) -> list[emp_work_detail.Detail]:
-    return emp_work_detail.select_detail_empid_workids(emp_id, work_ids)
+async def get_detail_empid_workids(emp_id: int, work_ids: str = Query(None)) -> list[emp_work_detail.Detail]:
+    return fast_json(await executor.read(emp_work_detail.select_detail_empid_workids, emp_id, parse_id_list(work_ids)))
+
+@app.post("/details/by-empid/{emp_id}", tags=["Employee Work Details"])
+async def post_detail_empid_workids(emp_id: int, request: emp_work_detail.WorkIdsRequest) -> list[emp_work_detail.Detail]:
+    return fast_json(await executor.read(emp_work_detail.select_detail_empid_workids, emp_id, list(dict.fromkeys(request.work_ids))))
 
 @app.post("/details/new_detail", tags=["Employee Work Details"])
-def post_detail(new_detail: emp_work_detail.Detail) -> emp_work_detail.Detail:
-    return emp_work_detail.create_new_detail(new_detail)
+async def post_detail(new_detail: emp_work_detail.Detail, request: Request) -> emp_work_detail.Detail:
+    return await idempotent_write(request, status.HTTP_200_OK, lambda d: d.detail_id != -1, emp_work_detail.create_new_detail, new_detail)
     
 @app.put("/details/update_detail", tags=["Employee Work Details"])
-def put_detail(exist_detail: emp_work_detail.Detail) -> emp_work_detail.Detail:
-    return emp_work_detail.update_existing_detail(exist_detail)    
+async def put_detail(exist_detail: emp_work_detail.Detail) -> emp_work_detail.Detail:
+    return await executor.write(emp_work_detail.update_existing_detail, exist_detail)
 
 @app.delete("/details/delete_detail/{detail_id}", tags=["Employee Work Details"])
-def delete_detail(detail_id: int) -> emp_work_detail.Detail:
-    return emp_work_detail.delete_existing_detail(detail_id)
+async def delete_detail(detail_id: int) -> emp_work_detail.Detail:
+    return await executor.write(emp_work_detail.delete_existing_detail, detail_id)
 ##### APIs for Employee Work Details #####
 
 ##### APIs for Payments #####
 @app.get("/payments/all_payments", tags=["Payments"])
-def get_all_payments() -> list[payments.Payments]:
-    return payments.select_all_payments()
+async def get_all_payments(request: Request, response: Response, after_id: int = 0, limit: int | None = Query(None, ge=1), stream: bool = False) -> list[payments.Payments]:
+    if stream:
+        return ndjson_response(payments.iter_all_payments(after_id, limit))
+    etag, result = await conditional_read(request, ("payments",), payments.select_all_payments, after_id, limit)
+    if result is NOT_MODIFIED:
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    set_next_cursor(response, result, limit, "pmt_id")
+    return fast_json(result, response)
 
 @app.get("/payments/by-id/{pmt_id}", tags=["Payments"])
-def get_payment_id(pmt_id: int) -> payments.Payments:
-    return payments.select_payment_id(pmt_id)
+async def get_payment_id(pmt_id: int) -> payments.Payments:
+    return await executor.read(payments.select_payment_id, pmt_id)
 
-# GET detail by list of work_ids (1-2-3-4-5-etc.)
+# GET payments by list of pmt_ids (1-2-3-4-5-etc.)
 @app.get("/payments/by-pmtids/{pmt_ids}", tags=["Payments"])
-def get_payments_workid_list(pmt_ids: str) -> list[payments.Payments]:
-    return payments.select_payment_pmtids(pmt_ids)
+async def get_payments_workid_list(pmt_ids: str) -> list[payments.Payments]:
+    return fast_json(await executor.read(payments.select_payment_pmtids, parse_id_list(pmt_ids)))
+
+# POST variant for id lists too long for a URL
+@app.post("/payments/by-pmtids", tags=["Payments"])
+async def post_payments_pmtid_list(request: payments.PmtIdsRequest) -> list[payments.Payments]:
+    return fast_json(await executor.read(payments.select_payment_pmtids, list(dict.fromkeys(request.pmt_ids))))
 
 # Create new payment
 @app.post("/payments/new_payment", tags=["Payments"])
-def post_payment(new_detail: payments.Payments) -> payments.Payments:
-    return payments.create_new_payment(new_detail)
+async def post_payment(new_detail: payments.Payments, request: Request) -> payments.Payments:
+    return await idempotent_write(request, status.HTTP_200_OK, lambda p: p.pmt_id != -1, payments.create_new_payment, new_detail)
 
 # Update existing payment
 @app.put("/payments/update_payment", tags=["Payments"])
-def put_payment(exist_detail: payments.Payments) -> payments.Payments:
-    return payments.update_existing_payment(exist_detail)    
+async def put_payment(exist_detail: payments.Payments) -> payments.Payments:
+    return await executor.write(payments.update_existing_payment, exist_detail)
 
 # Delete existing payment
 @app.delete("/payments/delete_payment/{pmt_id}", tags=["Payments"])
-def delete_payments(pmt_id: int) -> payments.Payments:
-    return payments.delete_existing_payment(pmt_id)
+async def delete_payments(pmt_id: int) -> payments.Payments:
+    return await executor.write(payments.delete_existing_payment, pmt_id)
 ##### APIs for Payments #####
+
+##### APIs for Tickets #####
+# Ticket reads join these tables, so a write to any of them changes their ETags
+TICKET_TABLES = ("works", "emp_work_detail", "payments", "employees")
+
+# POST a whole checkout (work + details + payments) atomically
+@app.post("/tickets/new_ticket", status_code=status.HTTP_201_CREATED, tags=["Tickets"])
+async def post_ticket(new_ticket: tickets.Ticket, request: Request) -> tickets.Ticket:
+    result = await idempotent_write(request, status.HTTP_201_CREATED, lambda t: t is not None, tickets.create_new_ticket, new_ticket)
+    if result is None:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error creating ticket")
+    return result
+
+# POST many checkouts in one transaction
+@app.post("/tickets/new_tickets", status_code=status.HTTP_201_CREATED, tags=["Tickets"])
+async def post_tickets(new_tickets: list[tickets.Ticket], request: Request) -> list[tickets.Ticket]:
+    if not new_tickets:
+        return []
+    result = await idempotent_write(request, status.HTTP_201_CREATED, bool, tickets.create_new_tickets, new_tickets)
+    if not result:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error creating tickets")
+    return result
+
+# GET one ticket with its details, technician names and payments
+@app.get("/tickets/by-id/{work_id}", tags=["Tickets"])
+async def get_ticket_id(work_id: int, request: Request, response: Response) -> tickets.TicketView:
+    etag, result = await conditional_read(request, TICKET_TABLES, tickets.select_ticket_id, work_id)
+    if result is NOT_MODIFIED:
+        return not_modified(etag)
+    if result is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Ticket {work_id} not found")
+    response.headers["ETag"] = etag
+    return fast_json(result, response)
+
+# GET every ticket between 2 datetimes (the day view)
+@app.get("/tickets/between-dates/{from_datetime}/{to_datetime}", tags=["Tickets"])
+async def get_tickets_date(from_datetime: str, to_datetime: str, request: Request, response: Response) -> list[tickets.TicketView]:
+    try:
+        etag, result = await conditional_read(request, TICKET_TABLES, tickets.select_tickets_between_dates, from_datetime, to_datetime)
+        if result is NOT_MODIFIED:
+            return not_modified(etag)
+        response.headers["ETag"] = etag
+        return fast_json(result, response)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+##### APIs for Tickets #####
+
+##### APIs for Reports #####
+def day_range(from_day: str, to_day: str) -> tuple[str, str]:
+    try:
+        return reports.validate_day_range(from_day, to_day)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Dates must be YYYY-MM-DD")
+
+@app.get("/reports/daily/{from_day}/{to_day}", tags=["Reports"])
+async def get_daily_report(from_day: str, to_day: str) -> list[reports.DailyTotal]:
+    return await executor.read(reports.select_daily_totals, *day_range(from_day, to_day))
+
+@app.get("/reports/employees/{from_day}/{to_day}", tags=["Reports"])
+async def get_employee_report(from_day: str, to_day: str) -> list[reports.EmployeeDailyTotal]:
+    return await executor.read(reports.select_employee_totals, *day_range(from_day, to_day))
+
+@app.get("/reports/payments/{from_day}/{to_day}", tags=["Reports"])
+async def get_payment_report(from_day: str, to_day: str) -> list[reports.PaymentDailyTotal]:
+    return await executor.read(reports.select_payment_totals, *day_range(from_day, to_day))
+
+@app.get("/reports/payroll/{from_day}/{to_day}", tags=["Reports"])
+async def get_payroll_report(from_day: str, to_day: str) -> list[reports.PayrollLine]:
+    return await executor.read(reports.select_payroll, *day_range(from_day, to_day))
+##### APIs for Reports #####
+
+##### APIs for Analytics #####
+@app.get("/analytics/commissions/{from_day}/{to_day}", tags=["Analytics"])
+async def get_commissions(from_day: str, to_day: str) -> list[analytics.CommissionLine]:
+    return await executor.read(analytics.select_commissions, *day_range(from_day, to_day))
+
+@app.get("/analytics/payment-split/{from_day}/{to_day}", tags=["Analytics"])
+async def get_payment_split(from_day: str, to_day: str) -> list[analytics.PaymentSplit]:
+    return await executor.read(analytics.select_payment_splits, *day_range(from_day, to_day))
+
+@app.get("/analytics/heatmap/{from_day}/{to_day}", tags=["Analytics"])
+async def get_heatmap(from_day: str, to_day: str, emp_id: int | None = None) -> analytics.Heatmap:
+    return await executor.read(analytics.select_heatmap, *day_range(from_day, to_day), emp_id)
+##### APIs for Analytics #####
+
+##### APIs for Exports #####
+@app.get("/exports/{dataset}/{from_day}/{to_day}", tags=["Exports"])
+async def get_export(dataset: export.Dataset, from_day: str, to_day: str, fmt: export.Format = Query("csv", alias="format")) -> StreamingResponse:
+    from_day, to_day = day_range(from_day, to_day)
+    if fmt != "csv" and not export.arrow_available():
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=f"{fmt} export needs pyarrow installed on the server")
+    filename = f"{dataset}_{from_day}_{to_day}.{fmt}"
+    return StreamingResponse(executor_chunks(export.iter_export(dataset, fmt, from_day, to_day)), media_type=export.MEDIA_TYPES[fmt],
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+##### APIs for Exports #####
+
+##### APIs for Search #####
+# Ranked full-text search; words match as prefixes ("mani" finds "manicure")
+@app.get("/search/works", tags=["Search"])
+async def get_search_works(q: str = Query(..., min_length=1, max_length=200), from_datetime: str | None = None, to_datetime: str | None = None,
+                           limit: int = Query(50, ge=1, le=500)) -> list[search.WorkHit]:
+    try:
+        return fast_json(await executor.read(search.search_works, q, from_datetime, to_datetime, limit))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@app.get("/search/details", tags=["Search"])
+async def get_search_details(q: str = Query(..., min_length=1, max_length=200), from_datetime: str | None = None, to_datetime: str | None = None,
+                             limit: int = Query(50, ge=1, le=500)) -> list[search.DetailHit]:
+    try:
+        return fast_json(await executor.read(search.search_details, q, from_datetime, to_datetime, limit))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+# Any part of a name or phone number
+@app.get("/search/employees", tags=["Search"])
+async def get_search_employees(q: str = Query(..., min_length=1, max_length=100), limit: int = Query(20, ge=1, le=100)) -> list[search.EmployeeHit]:
+    try:
+        return fast_json(await executor.read(search.search_employees, q, limit))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+##### APIs for Search #####
+
+##### APIs for Archive #####
+@app.get("/archive/partitions", tags=["Archive"])
+async def get_archive_partitions() -> list[archive.Partition]:
+    return await executor.read(archive.select_partitions)
+
+# Move a closed year of works, details and payments into its own archive file
+@app.post("/archive/years/{year}", status_code=status.HTTP_201_CREATED, tags=["Archive"])
+async def post_archive_year(year: int) -> archive.Partition:
+    try:
+        result = await executor.write(archive.archive_year, year)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error archiving {year}")
+    return result
+##### APIs for Archive #####
+
+##### APIs for Backups #####
+@app.get("/backups", tags=["Backups"])
+async def get_backups() -> list[database.BackupFile]:
+    return await executor.read(backups.files)
+
+# Start an online backup in the background; poll /backups/status for its progress
+@app.post("/backups", status_code=status.HTTP_202_ACCEPTED, tags=["Backups"])
+async def post_backup() -> database.BackupStatus:
+    try:
+        return backups.begin()
+    except database.BackupInProgress as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+# The running backup of this worker, or else its last finished one
+@app.get("/backups/status", tags=["Backups"])
+async def get_backup_status() -> database.BackupStatus:
+    result = backups.status()
+    if result is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No backup has run in this worker")
+    return result
+
+@app.get("/backups/{name}", tags=["Backups"])
+async def get_backup_file(name: str) -> FileResponse:
+    path = await executor.read(backups.path_of, name)
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Backup not found")
+    return FileResponse(path, media_type="application/gzip" if name.endswith(".gz") else "application/vnd.sqlite3", filename=name)
+##### APIs for Backups #####
+
+##### Live events #####
+# Seconds between keep-alive comments, so proxies do not close an idle stream
+EVENTS_KEEPALIVE = float(os.getenv('EVENTS_KEEPALIVE', '15'))
+
+async def event_stream(topics: set[str], last_event_id: str | None):
+    subscription = events.broker.subscribe(topics)
+    try:
+        yield b"retry: 3000\n\n"
+        # A reconnecting client may have missed events while it was away
+        # (any id from another worker or an earlier run has a different epoch, so it never matches)
+        if last_event_id is not None and last_event_id != events.broker.last_id:
+            yield events.resync_event(events.broker.last_id, topics).to_sse()
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), EVENTS_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield b": keep-alive\n\n"
+                continue
+            yield event.to_sse()
+    finally:
+        events.broker.unsubscribe(subscription)
+
+# Server-Sent Events: works, details, payments and tickets as they are created, updated or deleted
+@app.get("/events", tags=["Events"])
+async def get_events(topics: str | None = Query(None, description="Comma-separated: works,details,payments,tickets"),
+                     last_event_id: str | None = Header(None)) -> StreamingResponse:
+    selected = {t.strip() for t in topics.split(",") if t.strip()} if topics else set(events.TOPICS)
+    unknown = selected - set(events.TOPICS)
+    if unknown:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown topics: {', '.join(sorted(unknown))}")
+    return StreamingResponse(event_stream(selected, last_event_id), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+##### Live events #####
@@ -0,0 +1,173 @@
+from service.database import read_pool
+from service.datetimes import WORK_TS, SECONDS_PER_DAY, epoch_range
+from service.reports import PayrollLine
+from service import archive
+from pydantic import BaseModel
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Payroll analytics over raw rows. A period's details and payments are loaded once as NumPy
+# columns and every total is a vectorized group-by (np.unique + np.bincount) instead of a
+# Python loop per row. Archived years are routed in like any other date-range read.
+LOAD_BATCH_SIZE = 50000
+# Text columns (payment types) are loaded as fixed-width strings of up to this many characters
+TEXT_WIDTH = 32
+
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+# 1970-01-01, day 0 of WORK_TS, was a Thursday
+EPOCH_WEEKDAY = 3
+
+IN_RANGE = f"{WORK_TS} BETWEEN ? AND ?"
+DETAILS_QUERY = f"""
+    SELECT d.work_id, COALESCE(d.emp_id, 0), COALESCE(d.emp_amount, 0), COALESCE(d.emp_tip, 0)
+    FROM {{schema}}.emp_work_detail d JOIN {{schema}}.works w ON w.work_id = d.work_id
+    WHERE {IN_RANGE}"""
+PAYMENTS_QUERY = f"""
+    SELECT p.work_id, COALESCE(p.pmt_amount, 0), COALESCE(p.pmt_type, '')
+    FROM {{schema}}.payments p JOIN {{schema}}.works w ON w.work_id = p.work_id
+    WHERE {IN_RANGE}"""
+WORKS_QUERY = f"SELECT {WORK_TS}, COALESCE(w.work_grandtotal, 0) FROM {{schema}}.works w WHERE {IN_RANGE}"
+EMPLOYEE_WORKS_QUERY = f"""
+    SELECT {WORK_TS}, COALESCE(d.emp_amount, 0)
+    FROM {{schema}}.emp_work_detail d JOIN {{schema}}.works w ON w.work_id = d.work_id
+    WHERE {IN_RANGE} AND d.emp_id = ?"""
+
+# Per technician: the payroll of reports.select_payroll, computed from the raw rows, plus how
+# their work was paid. Each work's payments are shared among its details in proportion to
+# amount + tip, so revenue_by_type sums to what the technician brought in; tips_by_type
+# splits their tips the same way as the work's payments (card tips are paid out differently).
+class CommissionLine(PayrollLine):
+    revenue_by_type: dict[str, float] = {}
+    tips_by_type: dict[str, float] = {}
+
+class PaymentSplit(BaseModel):
+    pmt_type: str
+    payments_count: int = 0
+    pmt_amount: float = 0
+    share: float = 0  # of all payments in the period
+
+# Rows are weekdays (Mon first), columns hours 0-23 of shop time
+class Heatmap(BaseModel):
+    from_day: str
+    to_day: str
+    emp_id: int | None = None
+    weekdays: list[str] = list(WEEKDAYS)
+    revenue: list[list[float]]
+    tickets: list[list[int]]
+    average: list[list[float]]  # revenue per occurrence of that weekday in the period
+
+def load_columns(conn, template: str, from_day: str, to_day: str, dtypes: tuple, params: tuple = ()) -> list[np.ndarray]:
+    """Run template over main and the overlapping archives, returning one array per column.
+
+    template takes the day range's bounds as its first two parameters, then params.
+    """
+    start, end = epoch_range(from_day, to_day)
+    parts = archive.route(conn, from_day=from_day, to_day=to_day)
+    cursor = conn.cursor()
+    cursor.execute(*archive.union_query(template, (start, end, *params), parts))
+    # Each batch of rows goes straight into a record array, without transposing the tuples
+    record = np.dtype([(f"c{i}", f"U{TEXT_WIDTH}" if dtype is np.str_ else dtype) for i, dtype in enumerate(dtypes)])
+    chunks = []
+    while rows := cursor.fetchmany(LOAD_BATCH_SIZE):
+        chunks.append(np.fromiter(rows, dtype=record, count=len(rows)))
+    table = np.concatenate(chunks) if chunks else np.empty(0, record)
+    return [np.ascontiguousarray(table[name]) for name in record.names]
+
+def load_employees(conn) -> dict[int, tuple]:
+    cursor = conn.cursor()
+    cursor.execute("SELECT emp_id, emp_name, COALESCE(emp_work_percentage, 0), COALESCE(emp_cash_percentage, 0), COALESCE(emp_salary, 0) FROM employees")
+    return {row[0]: row[1:] for row in cursor.fetchall()}
+
+def group_sums(keys: np.ndarray, size: int, *weights: np.ndarray) -> list[np.ndarray]:
+    return [np.bincount(keys, weights=w, minlength=size) for w in weights]
+
+def commission_lines(detail_work, detail_emp, detail_amount, detail_tip, pmt_work, pmt_amount, pmt_type,
+                     employees: dict[int, tuple]) -> list[CommissionLine]:
+    if not len(detail_emp):
+        return []
+    emp_ids, emp_index = np.unique(detail_emp, return_inverse=True)
+    emp_count = len(emp_ids)
+    details_count = np.bincount(emp_index, minlength=emp_count)
+    amount, tips = group_sums(emp_index, emp_count, detail_amount, detail_tip)
+
+    staff = [employees.get(int(emp_id), ("", 0, 0, 0)) for emp_id in emp_ids]
+    work_percentage = np.array([s[1] for s in staff], dtype=np.float64)
+    cash_percentage = np.array([s[2] for s in staff], dtype=np.float64)
+    commission = np.round(amount * work_percentage / 100, 2)
+    cash_pay = np.round(commission * cash_percentage / 100, 2)
+
+    # Works x payment types matrix of amounts paid, over the works of both details and payments
+    types, type_index = np.unique(pmt_type, return_inverse=True)
+    type_count = len(types)
+    _, work_index = np.unique(np.concatenate((detail_work, pmt_work)), return_inverse=True)
+    detail_work_index, pmt_work_index = work_index[:len(detail_work)], work_index[len(detail_work):]
+    work_count = int(work_index.max()) + 1
+    paid = np.bincount(pmt_work_index * type_count + type_index, weights=pmt_amount, minlength=work_count * type_count).reshape(work_count, type_count).astype(np.float64)
+    work_paid = paid.sum(axis=1)
+
+    # Each detail's share of its work: by amount + tip, or equal when they are all zero
+    weight = detail_amount + detail_tip
+    work_weight = np.bincount(detail_work_index, weights=weight, minlength=work_count)[detail_work_index]
+    work_details = np.bincount(detail_work_index, minlength=work_count)[detail_work_index]
+    share = np.divide(weight, work_weight, out=1 / work_details, where=work_weight > 0)
+    paid_fraction = np.divide(paid, work_paid[:, None], out=np.zeros_like(paid), where=work_paid[:, None] > 0)[detail_work_index]
+
+    cells = (emp_index[:, None] * type_count + np.arange(type_count)).ravel()
+    revenue_by_type = np.bincount(cells, weights=(share[:, None] * paid[detail_work_index]).ravel(), minlength=emp_count * type_count).reshape(emp_count, type_count)
+    tips_by_type = np.bincount(cells, weights=(detail_tip[:, None] * paid_fraction).ravel(), minlength=emp_count * type_count).reshape(emp_count, type_count)
+
+    type_names = [str(t) for t in types]
+    return [CommissionLine(emp_id=int(emp_ids[i]), emp_name=staff[i][0] or "", details_count=int(details_count[i]),
+                           emp_amount=round(float(amount[i]), 2), emp_tip=round(float(tips[i]), 2),
+                           emp_work_percentage=staff[i][1], emp_cash_percentage=staff[i][2], emp_salary=staff[i][3],
+                           commission=float(commission[i]), cash_pay=float(cash_pay[i]), check_pay=round(float(commission[i] - cash_pay[i]), 2),
+                           revenue_by_type={t: round(float(v), 2) for t, v in zip(type_names, revenue_by_type[i])},
+                           tips_by_type={t: round(float(v), 2) for t, v in zip(type_names, tips_by_type[i])})
+            for i in range(emp_count)]
+
+def payment_splits(pmt_amount, pmt_type) -> list[PaymentSplit]:
+    types, type_index = np.unique(pmt_type, return_inverse=True)
+    counts = np.bincount(type_index, minlength=len(types))
+    amounts = np.bincount(type_index, weights=pmt_amount, minlength=len(types))
+    total = amounts.sum()
+    return [PaymentSplit(pmt_type=str(t), payments_count=int(c), pmt_amount=round(float(a), 2), share=round(float(a / total), 4) if total else 0)
+            for t, c, a in zip(types, counts, amounts)]
+
+def weekday_counts(from_day: str, to_day: str) -> np.ndarray:
+    start, end = epoch_range(from_day, to_day)
+    days = np.arange(start // SECONDS_PER_DAY, end // SECONDS_PER_DAY + 1)
+    return np.bincount((days + EPOCH_WEEKDAY) % 7, minlength=7)
+
+def revenue_heatmap(ts: np.ndarray, revenue: np.ndarray, from_day: str, to_day: str, emp_id: int | None = None) -> Heatmap:
+    cells = ((ts // SECONDS_PER_DAY + EPOCH_WEEKDAY) % 7) * 24 + ts // 3600 % 24
+    totals = np.bincount(cells, weights=revenue, minlength=7 * 24).reshape(7, 24).astype(np.float64)
+    tickets = np.bincount(cells, minlength=7 * 24).reshape(7, 24)
+    occurrences = weekday_counts(from_day, to_day)[:, None]
+    average = np.divide(totals, occurrences, out=np.zeros_like(totals), where=occurrences > 0)
+    return Heatmap(from_day=from_day, to_day=to_day, emp_id=emp_id, revenue=np.round(totals, 2).tolist(),
+                   tickets=tickets.tolist(), average=np.round(average, 2).tolist())
+
+# GET commission payroll per technician with tips and revenue by payment type
+def select_commissions(from_day: str, to_day: str) -> list[CommissionLine]:
+    with read_pool.connection() as conn:
+        detail_work, detail_emp, detail_amount, detail_tip = load_columns(conn, DETAILS_QUERY, from_day, to_day, (np.int64, np.int64, np.float64, np.float64))
+        pmt_work, pmt_amount, pmt_type = load_columns(conn, PAYMENTS_QUERY, from_day, to_day, (np.int64, np.float64, np.str_))
+        employees = load_employees(conn)
+    return commission_lines(detail_work, detail_emp, detail_amount, detail_tip, pmt_work, pmt_amount, pmt_type, employees)
+
+# GET payment count, amount and share per payment type
+def select_payment_splits(from_day: str, to_day: str) -> list[PaymentSplit]:
+    with read_pool.connection() as conn:
+        _, pmt_amount, pmt_type = load_columns(conn, PAYMENTS_QUERY, from_day, to_day, (np.int64, np.float64, np.str_))
+    return payment_splits(pmt_amount, pmt_type)
+
+# GET revenue per weekday and hour: works' grand totals, or one technician's amounts
+def select_heatmap(from_day: str, to_day: str, emp_id: int | None = None) -> Heatmap:
+    with read_pool.connection() as conn:
+        if emp_id is None:
+            ts, revenue = load_columns(conn, WORKS_QUERY, from_day, to_day, (np.int64, np.float64))
+        else:
+            ts, revenue = load_columns(conn, EMPLOYEE_WORKS_QUERY, from_day, to_day, (np.int64, np.float64), (emp_id,))
+    return revenue_heatmap(ts, revenue, from_day, to_day, emp_id)
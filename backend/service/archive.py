@@ -0,0 +1,227 @@
+from datetime import date, datetime
+from pathlib import Path
+from sqlite3 import Error
+from pydantic import BaseModel
+from service.database import read_pool, write_pool, db_path
+from service.datetimes import WORK_TS, to_epoch
+import logging
+import os
+import re
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+# Closed years can be moved out of natural_nails.db into one SQLite file per year. The
+# archive_partitions catalog in the main database records which works, details and payments
+# each file holds, and reads attach only the partitions that overlap what they ask for.
+archive_dir = Path(os.getenv('ARCHIVE_DIR', Path(db_path).resolve().parent / "archive"))
+
+ROLLUP_TABLES = ("daily_totals", "daily_employee_totals", "daily_payment_totals")
+
+PARTITION_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS {schema}.works(
+        work_id INTEGER PRIMARY KEY,
+        work_datetime TEXT,
+        work_amount REAL,
+        work_tip REAL,
+        work_discount REAL,
+        work_grandtotal REAL,
+        work_notes TEXT
+    );
+    CREATE TABLE IF NOT EXISTS {schema}.emp_work_detail(
+        detail_id INTEGER PRIMARY KEY,
+        work_id INTEGER,
+        emp_id INTEGER,
+        emp_amount REAL,
+        emp_tip REAL,
+        detail_notes TEXT
+    );
+    CREATE TABLE IF NOT EXISTS {schema}.payments(
+        pmt_id INTEGER PRIMARY KEY,
+        work_id INTEGER,
+        pmt_amount REAL,
+        pmt_type VARCHAR(10)
+    );
+    CREATE INDEX IF NOT EXISTS {schema}.idx_works_work_ts ON works(""" + WORK_TS + """);
+    CREATE INDEX IF NOT EXISTS {schema}.idx_detail_work_id ON emp_work_detail(work_id);
+    CREATE INDEX IF NOT EXISTS {schema}.idx_detail_emp_work ON emp_work_detail(emp_id, work_id);
+    CREATE INDEX IF NOT EXISTS {schema}.idx_payments_work_id ON payments(work_id);
+"""
+
+class Partition(BaseModel):
+    name: str
+    file: str
+    from_day: str
+    to_day: str
+    min_work_id: int | None = None
+    max_work_id: int | None = None
+    min_detail_id: int | None = None
+    max_detail_id: int | None = None
+    min_pmt_id: int | None = None
+    max_pmt_id: int | None = None
+    works_count: int = 0
+    details_count: int = 0
+    payments_count: int = 0
+    archived_at: str = ""
+
+    def id_range(self, key: str) -> tuple[int | None, int | None]:
+        return getattr(self, f"min_{key}_id"), getattr(self, f"max_{key}_id")
+
+def row_to_partition(row) -> Partition:
+    return Partition(name=row[0], file=row[1], from_day=row[2], to_day=row[3], min_work_id=row[4], max_work_id=row[5],
+                     min_detail_id=row[6], max_detail_id=row[7], min_pmt_id=row[8], max_pmt_id=row[9],
+                     works_count=row[10], details_count=row[11], payments_count=row[12], archived_at=row[13])
+
+def partitions(conn: sqlite3.Connection) -> list[Partition]:
+    return [row_to_partition(row) for row in conn.execute("SELECT * FROM archive_partitions ORDER BY from_day")]
+
+def attach(conn: sqlite3.Connection, parts: list[Partition]):
+    """Make sure every partition is attached to conn under its own name.
+
+    Pooled connections keep their attachments between requests; once SQLite's ATTACH
+    limit would be exceeded, partitions this query does not need are detached first.
+    """
+    if not parts:
+        return
+    attached = {row[1] for row in conn.execute("PRAGMA database_list")} - {"main", "temp"}
+    missing = [p for p in parts if p.name not in attached]
+    if not missing:
+        return
+    needed = {p.name for p in parts}
+    spare = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED) - len(attached)
+    for name in sorted(attached - needed):
+        if spare >= len(missing):
+            break
+        conn.execute(f"DETACH DATABASE {name}")
+        spare += 1
+    for part in missing:
+        # Pooled connections open URIs, so readers can attach archives read-only
+        conn.execute("ATTACH DATABASE ? AS " + part.name, ((archive_dir / part.file).resolve().as_uri() + "?mode=ro",))
+
+def route(conn: sqlite3.Connection, from_day: str | None = None, to_day: str | None = None,
+          key: str | None = None, ids: list[int] | None = None, after_id: int | None = None) -> list[Partition]:
+    """Attach and return the partitions a read has to look at besides main.
+
+    Filter by day range (YYYY-MM-DD prefixes), by ids of `key` ("work", "detail" or "pmt"),
+    or by keyset position (`after_id` of `key`). Filters combine with AND.
+    """
+    selected = []
+    for part in partitions(conn):
+        if from_day is not None and part.to_day < from_day[:10]:
+            continue
+        if to_day is not None and part.from_day > to_day[:10]:
+            continue
+        if key is not None:
+            low, high = part.id_range(key)
+            if low is None:
+                continue
+            if ids is not None and not any(low <= i <= high for i in ids):
+                continue
+            if after_id is not None and high <= after_id:
+                continue
+        selected.append(part)
+    attach(conn, selected)
+    return selected
+
+_placeholder = re.compile(r"\?")
+
+def union_query(template: str, params: tuple | list, parts: list[Partition],
+                order_by: str | None = None, limit: int | None = None) -> tuple[str, tuple]:
+    """Repeat a SELECT once for main and once per partition, joined with UNION ALL.
+
+    `template` names the archived tables as {schema}.works and so on. Placeholders are
+    numbered so every branch shares one set of parameters, which keeps IN lists under
+    SQLite's variable limit however many partitions are involved.
+    """
+    params = tuple(params)
+    if parts:
+        counter = iter(range(1, len(params) + 1))
+        template = _placeholder.sub(lambda _: f"?{next(counter)}", template)
+    sql = " UNION ALL ".join(template.format(schema=schema) for schema in ["main", *[p.name for p in parts]])
+    if order_by:
+        sql += f" ORDER BY {order_by}"
+    if limit is not None:
+        sql += f" LIMIT ?{len(params) + 1}" if parts else " LIMIT ?"
+        params += (limit,)
+    return sql, params
+
+def union_sql(table: str, where: str, params: tuple | list, parts: list[Partition],
+              order_by: str | None = None, limit: int | None = None) -> tuple[str, tuple]:
+    """SELECT * FROM main.table plus each partition's copy as one UNION ALL statement."""
+    return union_query(f"SELECT * FROM {{schema}}.{table} WHERE {where}", params, parts, order_by, limit)
+
+def routed_query(conn: sqlite3.Connection, table: str, where: str, params: tuple | list = (),
+                 order_by: str | None = None, limit: int | None = None, **filters) -> tuple[str, tuple]:
+    """Route with the given filters (see route) and build the matching UNION ALL query."""
+    return union_sql(table, where, params, route(conn, **filters), order_by, limit)
+
+# GET all archive partitions
+def select_partitions() -> list[Partition]:
+    with read_pool.connection() as conn:
+        return partitions(conn)
+
+def validate_archive_year(year: int) -> int:
+    # Only closed years can be archived: the current year still takes new tickets
+    if not 2000 <= year < date.today().year:
+        raise ValueError(f"Only closed years before {date.today().year} can be archived")
+    return year
+
+# POST / move every work of a closed year, with its details and payments, into archive/works_<year>.db
+def archive_year(year: int) -> Partition | None:
+    validate_archive_year(year)
+    name = f"archive_{year}"
+    file = f"works_{year}.db"
+    from_day, to_day = f"{year}-01-01", f"{year}-12-31"
+    in_year = f"{WORK_TS} >= ? AND {WORK_TS} < ?"
+    window = (to_epoch(datetime(year, 1, 1)), to_epoch(datetime(year + 1, 1, 1)))
+
+    with write_pool.connection() as conn:
+        cursor = conn.cursor()
+        if not cursor.execute(f"SELECT EXISTS(SELECT 1 FROM works WHERE {in_year})", window).fetchone()[0]:
+            raise ValueError(f"No works to archive in {year}")
+        archive_dir.mkdir(parents=True, exist_ok=True)
+        cursor.execute("ATTACH DATABASE ? AS " + name, ((archive_dir / file).resolve().as_uri(),))
+        try:
+            # 1. Copy into the archive file and commit it. Transactions spanning a WAL database and
+            #    an attached one are not atomic as a set, so the copy is made durable on its own;
+            #    rows only become visible from the archive once step 2 registers the partition.
+            cursor.execute("BEGIN")
+            for statement in PARTITION_SCHEMA.format(schema=name).split(";"):
+                if statement.strip():
+                    cursor.execute(statement)
+            cursor.execute(f"INSERT OR REPLACE INTO {name}.works SELECT * FROM main.works WHERE {in_year}", window)
+            moved = cursor.rowcount
+            for table in ("emp_work_detail", "payments"):
+                cursor.execute(f"INSERT OR REPLACE INTO {name}.{table} SELECT * FROM main.{table} WHERE work_id IN (SELECT work_id FROM main.works WHERE {in_year})", window)
+            conn.commit()
+
+            # 2. Remove the rows from main and register the partition in one transaction. The delete
+            #    triggers would take the archived days out of the rollups, so those are put back.
+            cursor.execute("BEGIN")
+            for table in ROLLUP_TABLES:
+                cursor.execute(f"CREATE TEMP TABLE saved_{table} AS SELECT * FROM main.{table} WHERE day BETWEEN ? AND ?", (from_day, to_day))
+            for table in ("emp_work_detail", "payments"):
+                cursor.execute(f"DELETE FROM main.{table} WHERE work_id IN (SELECT work_id FROM main.works WHERE {in_year})", window)
+            cursor.execute(f"DELETE FROM main.works WHERE {in_year}", window)
+            for table in ROLLUP_TABLES:
+                cursor.execute(f"DELETE FROM main.{table} WHERE day BETWEEN ? AND ?", (from_day, to_day))
+                cursor.execute(f"INSERT INTO main.{table} SELECT * FROM temp.saved_{table}")
+                cursor.execute(f"DROP TABLE temp.saved_{table}")
+            cursor.execute(f"""
+                INSERT OR REPLACE INTO archive_partitions
+                SELECT ?, ?, ?, ?, w.lo, w.hi, d.lo, d.hi, p.lo, p.hi, w.n, d.n, p.n, ?
+                FROM (SELECT MIN(work_id) lo, MAX(work_id) hi, COUNT(*) n FROM {name}.works) w,
+                     (SELECT MIN(detail_id) lo, MAX(detail_id) hi, COUNT(*) n FROM {name}.emp_work_detail) d,
+                     (SELECT MIN(pmt_id) lo, MAX(pmt_id) hi, COUNT(*) n FROM {name}.payments) p
+                """, (name, file, from_day, to_day, datetime.now().isoformat(timespec="seconds")))
+            conn.commit()
+            partition = row_to_partition(cursor.execute("SELECT * FROM archive_partitions WHERE name = ?", (name,)).fetchone())
+            logger.info(f"Archived {year}: {moved} works moved to {archive_dir / file}")
+        except Error as e:
+            logger.error(f"Database error archiving {year}: {e}")
+            conn.rollback()
+            return None
+        finally:
+            cursor.execute(f"DETACH DATABASE {name}")
+
+    return partition
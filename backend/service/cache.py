@@ -0,0 +1,94 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+from pydantic_core import to_json
+
+logger = logging.getLogger(__name__)
+
+class CacheEntry:
+    __slots__ = ("value", "etag", "expires_at")
+
+    def __init__(self, value: Any, etag: str, expires_at: float):
+        self.value = value
+        self.etag = etag
+        self.expires_at = expires_at
+
+def make_etag(value: Any) -> str:
+    # Strong ETag over the JSON form, so it survives restarts and matches across workers
+    return '"' + hashlib.sha256(to_json(value)).hexdigest()[:32] + '"'
+
+def versions_etag(versions: dict[str, int], key: str) -> str:
+    # Changes whenever one of the tables behind a response is written, see database.select_table_versions
+    return make_etag({"versions": versions, "key": key})
+
+def etag_matches(if_none_match: str | None, etag: str | None) -> bool:
+    if not if_none_match or not etag:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+class ReadThroughCache:
+    """In-process TTL cache for rarely-changing tables.
+
+    Values are loaded on a miss and kept until they expire or the owning service
+    module calls invalidate() after a write. A load that races with an invalidation
+    is returned to its caller but never stored.
+    """
+    def __init__(self, name: str, ttl: float = 300, max_entries: int = 256):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, CacheEntry] = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _fresh(self, key: Hashable) -> CacheEntry | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get_entry(self, key: Hashable, loader: Callable[[], Any]) -> CacheEntry:
+        with self._lock:
+            entry = self._fresh(key)
+            if entry is not None:
+                self.hits += 1
+                return entry
+            self.misses += 1
+            generation = self._generation
+
+        value = loader()
+        entry = CacheEntry(value, make_etag(value), time.monotonic() + self.ttl)
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = entry
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def get(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        return self.get_entry(key, loader).value
+
+    def etag(self, key: Hashable) -> str | None:
+        with self._lock:
+            entry = self._fresh(key)
+            return entry.etag if entry else None
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+        logger.info(f"Cache invalidated: {self.name}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"name": self.name, "entries": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,87 @@
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import DEFAULT_EXCLUDED_CONTENT_TYPES, GZipMiddleware, GZipResponder, IdentityResponder
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# brotli is optional: without it every client that accepts gzip gets gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+def accepted_encodings(accept_encoding: str) -> set[str]:
+    encodings = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            encodings.add(coding.strip().lower())
+    return encodings
+
+# Sent as they are: event streams, plus backup downloads, which are already compressed or too
+# large to compress on the fly and must keep Content-Length for range requests
+EXCLUDED_CONTENT_TYPES = (*DEFAULT_EXCLUDED_CONTENT_TYPES, "application/gzip", "application/vnd.sqlite3")
+
+class ExcludedTypesResponder(IdentityResponder):
+    async def send_with_compression(self, message: Message) -> None:
+        await super().send_with_compression(message)
+        if message["type"] == "http.response.start":
+            content_type = Headers(raw=message["headers"]).get("content-type", "")
+            self.content_type_is_excluded = content_type.startswith(EXCLUDED_CONTENT_TYPES)
+
+class BrotliResponder(ExcludedTypesResponder):
+    content_encoding = "br"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int = 4) -> None:
+        super().__init__(app, minimum_size)
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        # Flush after every chunk so streamed NDJSON still reaches the client batch by batch
+        data = self.compressor.process(body)
+        return data + (self.compressor.flush() if more_body else self.compressor.finish())
+
+class FlushingGZipResponder(GZipResponder, ExcludedTypesResponder):
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        # GzipFile holds output back in zlib until it is closed: sync-flush every chunk of a
+        # streamed response, like BrotliResponder does
+        if more_body:
+            self.gzip_file.write(body)
+            self.gzip_file.flush()
+            data = self.gzip_buffer.getvalue()
+            self.gzip_buffer.seek(0)
+            self.gzip_buffer.truncate()
+            return data
+        return super().apply_compression(body, more_body=False)
+
+class CompressionMiddleware(GZipMiddleware):
+    """Starlette's GZipMiddleware, preferring brotli when the client and server both support it.
+
+    Responses under minimum_size, EXCLUDED_CONTENT_TYPES and responses that are already
+    encoded pass through untouched. A compressed body is a different representation from the
+    identity one, so its ETag is sent as weak (W/"..."). The conditional GET helpers
+    ignore the W/ prefix when they compare.
+    """
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, compresslevel: int = 6, brotli_quality: int = 4) -> None:
+        super().__init__(app, minimum_size=minimum_size, compresslevel=compresslevel)
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_weak_etag(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                etag = headers.get("etag")
+                if etag and "content-encoding" in headers and not etag.startswith("W/"):
+                    headers["etag"] = "W/" + etag
+            await send(message)
+
+        accepted = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        if brotli is not None and "br" in accepted:
+            responder = BrotliResponder(self.app, self.minimum_size, self.brotli_quality)
+        elif "gzip" in accepted:
+            responder = FlushingGZipResponder(self.app, self.minimum_size, compresslevel=self.compresslevel)
+        else:
+            responder = IdentityResponder(self.app, self.minimum_size)
+        await responder(scope, receive, send_with_weak_etag)
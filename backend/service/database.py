@@ -1,44 +1,1142 @@
+import asyncio
+import functools
+import gzip
 import queue
+import re
+import shutil
 import sqlite3
+import threading
 import logging
 import os
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from contextlib import contextmanager
+from datetime import datetime
+from itertools import count
+from pathlib import Path
+from pydantic import BaseModel
+from service import metrics
+from service.datetimes import WORK_TS, normalize_datetime
 
 logger = logging.getLogger(__name__)
 
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that reports each statement's execute-plus-fetch time to service.metrics.
+
+    SQLite does most of a SELECT's work while rows are stepped, so the timing of a
+    statement with a result set is closed when its rows run out (or the next execute).
+    """
+    _statement = None
+    _elapsed = 0.0
+
+    def _flush(self):
+        if self._statement is not None:
+            metrics.observe_query(self._statement, self._elapsed)
+            self._statement = None
+
+    def _timed(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self._elapsed += time.perf_counter() - start
+
+    def execute(self, sql, parameters=()):
+        self._flush()
+        self._statement, self._elapsed = sql, 0.0
+        self._timed(super().execute, sql, parameters)
+        if self.description is None:
+            self._flush()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._flush()
+        self._statement, self._elapsed = sql, 0.0
+        self._timed(super().executemany, sql, seq_of_parameters)
+        self._flush()
+        return self
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if row is None:
+            self._flush()
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        rows = self._timed(super().fetchmany, size)
+        if len(rows) < size:
+            self._flush()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        self._flush()
+        return rows
+
+    def close(self):
+        self._flush()
+        super().close()
+
+    def __del__(self):
+        # fetchone() lookups usually just drop the cursor without exhausting it
+        self._flush()
+
+class TimedConnection(sqlite3.Connection):
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    # The C implementations of these bypass cursor(), so route them through it
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+class ConnectionProfile(BaseModel):
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    mmap_size: int = 256 * 1024 * 1024
+    cache_size: int = -16000  # negative = KiB, so ~16MB of page cache per connection
+    temp_store: str = "MEMORY"
+
+    @classmethod
+    def from_env(cls) -> "ConnectionProfile":
+        defaults = cls()
+        return cls(
+            journal_mode=os.getenv('DB_JOURNAL_MODE', defaults.journal_mode),
+            synchronous=os.getenv('DB_SYNCHRONOUS', defaults.synchronous),
+            mmap_size=int(os.getenv('DB_MMAP_SIZE', str(defaults.mmap_size))),
+            cache_size=int(os.getenv('DB_CACHE_SIZE', str(defaults.cache_size))),
+            temp_store=os.getenv('DB_TEMP_STORE', defaults.temp_store),
+        )
+
+    def apply(self, conn: sqlite3.Connection, readonly: bool = False):
+        # journal_mode is persistent in the database file, so only the writer sets it
+        if not readonly:
+            conn.execute(f"PRAGMA journal_mode={self.journal_mode}")
+            conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        conn.execute(f"PRAGMA cache_size={int(self.cache_size)}")
+        conn.execute(f"PRAGMA temp_store={self.temp_store}")
+
 class ConnectionPool:
-    def __init__(self, max_connections, database, default_timeout=10):
+    def __init__(self, max_connections, database, default_timeout=10, health_check=True, profile=None, readonly=False):
         self.default_timeout = default_timeout
         self.max_connections = max_connections
         self.database = database
+        self.health_check = health_check
+        self.profile = profile or ConnectionProfile()
+        self.readonly = readonly
+        self.name = "read" if readonly else "write"
         self.pool = queue.Queue(maxsize=max_connections)
+        # Connections are opened on first use or by open(), never at import, so each
+        # uvicorn worker only connects once it is actually serving
+        self.created = 0
+        self.lock = threading.Lock()
+        # Set on the group-commit writer thread while it runs a batch, see GroupCommitWriter
+        self.local = threading.local()
 
-        for _ in range(max_connections):
-            conn = self.create_connection()
-            self.pool.put(conn)
-        logger.info(f"Connection pool initialized with {max_connections} connections to {database}")
+    def open(self):
+        """Open the remaining connections up front instead of on first checkout."""
+        while self.reserve():
+            self.pool.put(self.create_reserved())
+        mode = "read-only" if self.readonly else "read-write"
+        logger.info(f"Connection pool opened with {self.max_connections} {mode} connections to {self.database}")
+
+    def reserve(self) -> bool:
+        with self.lock:
+            if self.created >= self.max_connections:
+                return False
+            self.created += 1
+            return True
+
+    def create_reserved(self):
+        try:
+            return self.create_connection()
+        except sqlite3.Error:
+            with self.lock:
+                self.created -= 1
+            raise
+
+    def close(self):
+        while True:
+            try:
+                conn = self.pool.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self.lock:
+                self.created -= 1
 
     def create_connection(self):
-        return sqlite3.connect(self.database, check_same_thread=False, timeout=self.default_timeout)
+        # Always open by URI so ATTACH (see service.archive) can pass ?mode=ro too
+        uri = Path(self.database).resolve().as_uri() + ("?mode=ro" if self.readonly else "")
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False, timeout=self.default_timeout, factory=TimedConnection)
+        self.profile.apply(conn, readonly=self.readonly)
+        return conn
+
+    def is_healthy(self, conn) -> bool:
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error as e:
+            logger.warning(f"Discarding broken pooled connection: {e}")
+            return False
 
     def get_connection(self):
+        start = time.perf_counter()
         try:
-            return self.pool.get(timeout=self.default_timeout)
+            try:
+                conn = self.pool.get_nowait()
+            except queue.Empty:
+                if self.reserve():
+                    return self.create_reserved()
+                conn = self.pool.get(timeout=self.default_timeout)
         except queue.Empty:
+            metrics.pool_timeouts.inc(self.name)
             logger.error("No available connections in pool after timeout")
             raise RuntimeError("Timeout: No available connections in the pool.")
+        finally:
+            metrics.pool_wait.observe(time.perf_counter() - start, self.name)
+
+        if self.health_check and not self.is_healthy(conn):
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+            conn = self.create_connection()
+        return conn
 
     def release_connection(self, conn):
         self.pool.put(conn)
 
     @contextmanager
     def connection(self):
+        batch = getattr(self.local, "batch", None)
+        if batch is not None:
+            yield batch
+            return
         conn = self.get_connection()
         try:
             yield conn
         finally:
             self.release_connection(conn)
-        
-# Initialize connection pool with configurable DB path
+
+    def stats(self) -> dict:
+        idle = self.pool.qsize()
+        return {"max_connections": self.max_connections, "open": self.created, "available": self.max_connections - self.created + idle, "in_use": self.created - idle}
+
+class DatabaseExecutor:
+    """Runs blocking service-layer calls off the event loop.
+
+    Reads fan out over a dedicated thread pool sized to the read-only pool, while
+    writes are funnelled through a single writer thread that owns the writer
+    connection, so `async def` routes never block the loop and never compete with
+    Starlette's shared threadpool.
+    """
+    def __init__(self, read_workers: int):
+        self.read_workers = read_workers
+        self.reader = None
+        self.writer = None
+        self.group_writer: GroupCommitWriter | None = None
+
+    def start(self):
+        if self.reader is None:
+            self.reader = ThreadPoolExecutor(max_workers=self.read_workers, thread_name_prefix="db-read")
+            self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-write")
+
+    async def read(self, func, *args, **kwargs):
+        self.start()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.reader, functools.partial(func, *args, **kwargs))
+
+    async def write(self, func, *args, **kwargs):
+        self.start()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.writer, functools.partial(func, *args, **kwargs))
+
+    async def insert(self, func, *args, **kwargs):
+        """Like write(), but through the group-commit writer when DB_GROUP_COMMIT is enabled.
+
+        Only for service functions that make a single commit() or rollback() on the
+        writer connection, such as the create_new_* functions.
+        """
+        if self.group_writer is None:
+            return await self.write(func, *args, **kwargs)
+        return await asyncio.wrap_future(self.group_writer.submit(func, *args, **kwargs))
+
+    def shutdown(self):
+        if self.group_writer is not None:
+            self.group_writer.stop()
+        if self.reader is not None:
+            self.reader.shutdown(wait=True)
+            self.writer.shutdown(wait=True)
+            self.reader = self.writer = None
+
+class BatchConnection:
+    """The writer connection as seen by one job of a group commit (or of write_transaction).
+
+    Service functions keep their usual commit()/rollback() calls. Inside a batch those
+    release or roll back the job's savepoint, and the batch's single COMMIT makes every
+    job durable at once.
+    """
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.callbacks = []
+        self.open = False
+
+    def begin_job(self):
+        self.conn.execute("SAVEPOINT job")
+        self.open = True
+
+    def commit(self):
+        if self.open:
+            self.conn.execute("RELEASE SAVEPOINT job")
+            self.open = False
+
+    def rollback(self):
+        if self.open:
+            self.conn.execute("ROLLBACK TO SAVEPOINT job")
+            self.conn.execute("RELEASE SAVEPOINT job")
+            self.open = False
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+def run_callbacks(callbacks: list):
+    for callback in callbacks:
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"After-commit callback failed: {e}")
+
+class GroupCommitWriter:
+    """Optional write-behind queue that commits many small writes in one transaction.
+
+    Jobs are taken off the queue by one thread, which keeps collecting until max_batch
+    jobs are waiting or window seconds have passed since the first one, then runs them
+    back to back in a single transaction, one savepoint per job. Callers' futures are
+    resolved only after that COMMIT returns, so an answered write is exactly as durable as
+    with per-call commits; a crash before the COMMIT loses the batch, but no caller was
+    told it succeeded. A failing job rolls back only its own savepoint.
+    """
+    def __init__(self, pool: "ConnectionPool", window: float = 0.002, max_batch: int = 64):
+        self.pool = pool
+        self.window = window
+        self.max_batch = max_batch
+        self.jobs = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name="db-group-commit", daemon=True)
+                self.thread.start()
+
+    def stop(self):
+        # Jobs queued before the sentinel are still committed
+        if self.thread is not None:
+            self.jobs.put(None)
+            self.thread.join()
+            self.thread = None
+
+    def submit(self, func, *args, **kwargs) -> Future:
+        self.start()
+        future = Future()
+        self.jobs.put((future, functools.partial(func, *args, **kwargs)))
+        return future
+
+    def collect(self, first) -> tuple[list, bool]:
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            try:
+                job = self.jobs.get_nowait() if self.window <= 0 else self.jobs.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if job is None:
+                return batch, True
+            batch.append(job)
+        return batch, False
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            first = self.jobs.get()
+            if first is None:
+                break
+            batch, stopping = self.collect(first)
+            self.commit_batch(batch)
+
+    def commit_batch(self, batch: list):
+        results = []
+        with self.pool.connection() as conn:
+            proxy = BatchConnection(conn)
+            self.pool.local.batch = proxy
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                for future, call in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    proxy.begin_job()
+                    try:
+                        results.append((future, call(), None))
+                        proxy.commit()
+                    except BaseException as e:
+                        proxy.rollback()
+                        results.append((future, None, e))
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Group commit of {len(batch)} writes failed: {e}")
+                conn.rollback()
+                proxy.callbacks.clear()
+                results = [(future, None, e) for future, _ in batch if not future.cancelled()]
+            finally:
+                self.pool.local.batch = None
+
+        metrics.group_commit_size.observe(len(results))
+        run_callbacks(proxy.callbacks)
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+class ChangeWatcher:
+    """Tells this process's caches about commits made by other uvicorn workers.
+
+    A dedicated read-only connection polls PRAGMA data_version, which moves whenever any
+    other connection commits. Only then is table_versions read, and the callbacks of every
+    table whose counter moved are run with how many steps it moved (one per row written).
+    Writes made by this process are seen as well, so callbacks must be cheap and safe to repeat.
+    """
+    def __init__(self, database: str, interval: float = 1.0):
+        self.database = database
+        self.interval = interval
+        self.callbacks: dict[str, list] = {}
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def on_change(self, table: str, callback):
+        self.callbacks.setdefault(table, []).append(callback)
+
+    def start(self):
+        if self.interval <= 0 or (self.thread is not None and self.thread.is_alive()):
+            return
+        self.stopping.clear()
+        # A plain connection, so polling stays out of the query metrics. The baseline is read
+        # before start() returns, so no write made after startup is taken for the starting state
+        conn = sqlite3.connect(Path(self.database).resolve().as_uri() + "?mode=ro", uri=True, isolation_level=None, check_same_thread=False)
+        self.thread = threading.Thread(target=self.run, args=(conn, *self.snapshot(conn)), name="db-change-watcher", daemon=True)
+        self.thread.start()
+
+    @staticmethod
+    def snapshot(conn: sqlite3.Connection) -> tuple[int, dict[str, int]]:
+        return conn.execute("PRAGMA data_version").fetchone()[0], dict(conn.execute("SELECT table_name, version FROM table_versions"))
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(timeout=self.interval + 5)
+            self.thread = None
+
+    def notify(self, changes: dict[str, int]):
+        for table, steps in changes.items():
+            for callback in self.callbacks.get(table, ()):
+                try:
+                    callback(steps)
+                except Exception as e:
+                    logger.error(f"Change callback for {table} failed: {e}")
+
+    def run(self, conn: sqlite3.Connection, data_version: int, versions: dict[str, int]):
+        try:
+            while not self.stopping.wait(self.interval):
+                try:
+                    current = conn.execute("PRAGMA data_version").fetchone()[0]
+                    if current == data_version:
+                        continue
+                    data_version, latest = self.snapshot(conn)
+                    changed = {table: version - versions.get(table, 0) for table, version in latest.items() if versions.get(table) != version}
+                    versions = latest
+                    self.notify(changed)
+                except sqlite3.Error as e:
+                    logger.warning(f"Change watcher poll failed: {e}")
+        finally:
+            conn.close()
+
+class BackupStatus(BaseModel):
+    id: int
+    trigger: str  # "manual" or "scheduled"
+    state: str = "running"  # running, done or failed
+    file: str = ""
+    started_at: str
+    finished_at: str | None = None
+    duration_seconds: float = 0
+    pages_total: int = 0
+    pages_done: int = 0
+    restarts: int = 0
+    size_bytes: int = 0
+    compressed: bool = False
+    error: str | None = None
+
+class BackupFile(BaseModel):
+    name: str
+    size_bytes: int
+    created_at: str
+
+class BackupInProgress(Exception):
+    pass
+
+class BackupAborted(Exception):
+    pass
+
+class BackupRestarting(Exception):
+    pass
+
+class BackupManager:
+    """Online snapshots of the database with the sqlite3 backup API, off the request path.
+
+    Each backup runs on its own thread with its own read-only source connection, so no pooled
+    connection is held while it copies. Pages are copied step_pages at a time with step_sleep
+    seconds between steps; under WAL the copy never blocks writers. A commit from another
+    connection restarts a paged copy, so after MAX_RESTARTS the rest is copied in one step,
+    which reads a single consistent snapshot while writers carry on.
+
+    Finished files are named <db stem>-YYYYmmdd-HHMMSS.db (.db.gz when compressed) and only
+    the newest `keep` are kept. A lock file in the backup directory keeps uvicorn workers
+    from running backups at the same time.
+    """
+    MAX_RESTARTS = 3
+    # A lock file older than this was left by a crashed worker
+    STALE_LOCK_SECONDS = 6 * 3600
+
+    def __init__(self, database: str, directory: str | Path, step_pages: int = 256, step_sleep: float = 0.05,
+                 keep: int = 7, compress: bool = False, interval: float = 0):
+        self.database = database
+        self.directory = Path(directory)
+        self.step_pages = step_pages
+        self.step_sleep = step_sleep
+        self.keep = keep
+        self.compress = compress
+        self.interval = interval
+        self.prefix = Path(database).stem
+        self.pattern = re.compile(rf"^{re.escape(self.prefix)}-\d{{8}}-\d{{6}}\.db(\.gz)?$")
+        self.lock = threading.Lock()
+        self.ids = count(1)
+        self.current: BackupStatus | None = None
+        self.history: deque[BackupStatus] = deque(maxlen=20)
+        self.stopping = threading.Event()
+        self.scheduler = None
+        self.worker = None
+
+    @property
+    def lock_file(self) -> Path:
+        return self.directory / ".backup.lock"
+
+    def start(self):
+        self.stopping.clear()
+        if self.interval <= 0 or (self.scheduler is not None and self.scheduler.is_alive()):
+            return
+        self.scheduler = threading.Thread(target=self.schedule, name="db-backup-scheduler", daemon=True)
+        self.scheduler.start()
+
+    def stop(self):
+        # A backup still running is aborted at its next step and its partial file removed
+        self.stopping.set()
+        for thread in (self.scheduler, self.worker):
+            if thread is not None:
+                thread.join(timeout=30)
+        self.scheduler = None
+
+    def files(self) -> list[BackupFile]:
+        """Finished snapshots, newest first."""
+        if not self.directory.is_dir():
+            return []
+        found = []
+        for path in self.directory.iterdir():
+            if self.pattern.match(path.name):
+                st = path.stat()
+                found.append(BackupFile(name=path.name, size_bytes=st.st_size,
+                                        created_at=datetime.fromtimestamp(st.st_mtime).isoformat(timespec="seconds")))
+        return sorted(found, key=lambda f: f.name, reverse=True)
+
+    def path_of(self, name: str) -> Path | None:
+        # Only names this manager writes, so a request cannot reach outside the directory
+        if not self.pattern.match(name) or not (self.directory / name).is_file():
+            return None
+        return self.directory / name
+
+    def status(self) -> BackupStatus | None:
+        with self.lock:
+            status = self.current or (self.history[-1] if self.history else None)
+            return status.model_copy() if status is not None else None
+
+    def claim(self) -> bool:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for _ in range(2):
+            try:
+                fd = os.open(self.lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    if time.time() - self.lock_file.stat().st_mtime < self.STALE_LOCK_SECONDS:
+                        return False
+                    self.lock_file.unlink()
+                except FileNotFoundError:
+                    pass
+                continue
+            os.write(fd, str(os.getpid()).encode())
+            os.close(fd)
+            return True
+        return False
+
+    def begin(self, trigger: str = "manual") -> BackupStatus:
+        """Start a backup on a background thread and return its status right away."""
+        with self.lock:
+            if self.current is not None or not self.claim():
+                raise BackupInProgress("A backup is already running")
+            self.current = BackupStatus(id=next(self.ids), trigger=trigger, started_at=datetime.now().isoformat(timespec="seconds"),
+                                        compressed=self.compress)
+            status = self.current.model_copy()
+            self.worker = threading.Thread(target=self.run, args=(self.current,), name="db-backup", daemon=True)
+            self.worker.start()
+        return status
+
+    def run(self, status: BackupStatus):
+        started = time.perf_counter()
+        try:
+            self.snapshot(status)
+            status.state = "done"
+            logger.info(f"Backup {status.file} written in {time.perf_counter() - started:.1f}s "
+                        f"({status.pages_total} pages, {status.size_bytes} bytes, {status.restarts} restarts)")
+            self.rotate()
+        except Exception as e:
+            status.state = "failed"
+            status.error = str(e)
+            logger.error(f"Backup failed: {e}")
+        finally:
+            status.duration_seconds = round(time.perf_counter() - started, 3)
+            status.finished_at = datetime.now().isoformat(timespec="seconds")
+            metrics.backup_duration.observe(status.duration_seconds, status.trigger)
+            with self.lock:
+                self.history.append(status)
+                self.current = None
+                self.lock_file.unlink(missing_ok=True)
+
+    def progress(self, status: BackupStatus, _, remaining: int, total: int):
+        if self.stopping.is_set():
+            raise BackupAborted("Backup aborted by shutdown")
+        done = total - remaining
+        if done < status.pages_done:
+            status.restarts += 1
+            if status.restarts > self.MAX_RESTARTS:
+                raise BackupRestarting(f"Restarted {status.restarts} times")
+        status.pages_total, status.pages_done = total, done
+        # backup()'s own sleep only applies to busy retries: pause here so writers get the lock between steps
+        if remaining and self.stopping.wait(self.step_sleep):
+            raise BackupAborted("Backup aborted by shutdown")
+
+    def snapshot(self, status: BackupStatus):
+        name = f"{self.prefix}-{datetime.now():%Y%m%d-%H%M%S}.db"
+        target = self.directory / name
+        partial = self.directory / (name + ".partial")
+        compressed = self.directory / (name + ".gz.partial")
+        try:
+            # Plain connections, so the copy stays out of the pools and the query metrics
+            source = sqlite3.connect(Path(self.database).resolve().as_uri() + "?mode=ro", uri=True)
+            copy = sqlite3.connect(partial)
+            try:
+                try:
+                    source.backup(copy, pages=self.step_pages, progress=functools.partial(self.progress, status), sleep=self.step_sleep)
+                except BackupRestarting:
+                    logger.warning(f"Backup restarted {status.restarts} times by concurrent writes, copying the rest in one step")
+                    source.backup(copy, pages=-1)
+                    status.pages_done = status.pages_total
+                # A self-contained file, without the -wal the source runs with
+                copy.execute("PRAGMA journal_mode=DELETE")
+                check = copy.execute("PRAGMA quick_check").fetchone()[0]
+                if check != "ok":
+                    raise sqlite3.DatabaseError(f"Backup failed its integrity check: {check}")
+            finally:
+                copy.close()
+                source.close()
+
+            if self.compress:
+                with open(partial, "rb") as src, gzip.open(compressed, "wb", compresslevel=6) as dst:
+                    shutil.copyfileobj(src, dst, 1 << 20)
+                partial.unlink()
+                target = self.directory / (name + ".gz")
+                os.replace(compressed, target)
+            else:
+                os.replace(partial, target)
+        finally:
+            partial.unlink(missing_ok=True)
+            compressed.unlink(missing_ok=True)
+        status.file = target.name
+        status.size_bytes = target.stat().st_size
+
+    def rotate(self):
+        for old in self.files()[self.keep:]:
+            (self.directory / old.name).unlink(missing_ok=True)
+            logger.info(f"Removed old backup {old.name}")
+
+    def due(self) -> bool:
+        # Any worker's snapshot counts, so only one of them backs up per interval
+        newest = self.files()
+        if not newest:
+            return True
+        return time.time() - (self.directory / newest[0].name).stat().st_mtime >= self.interval
+
+    def schedule(self):
+        while not self.stopping.wait(min(self.interval, 60)):
+            try:
+                if self.due():
+                    self.begin("scheduled")
+            except BackupInProgress:
+                pass
+            except Exception as e:
+                logger.error(f"Scheduled backup could not start: {e}")
+
+MAX_VARIABLES = 900
+
+def parse_ids(ids: str | None) -> list[int]:
+    """Parse "1-2-3" or "1,2,3" into a list of unique ids, keeping their order."""
+    if not ids:
+        return []
+    parsed = [int(part) for part in ids.replace('-', ',').split(',') if part.strip()]
+    return list(dict.fromkeys(parsed))
+
+def chunked(items: list, size: int = MAX_VARIABLES):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def placeholders(count: int) -> str:
+    return ", ".join("?" * count)
+
+# Rows pulled per fetchmany() call when streaming large result sets
+FETCH_BATCH_SIZE = 500
+
+def iter_batches(sql, params=(), batch_size: int = FETCH_BATCH_SIZE):
+    """Yield lists of rows with fetchmany, holding one read connection for the whole scan.
+
+    sql may also be a callable that takes the connection and returns (sql, params), for
+    queries that depend on the connection, like routing over attached archives.
+    """
+    with read_pool.connection() as conn:
+        if callable(sql):
+            sql, params = sql(conn)
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+
+# Per-day rollups kept current by triggers, so reports never scan the raw tables.
+# Details and payments are bucketed on the day of the work they belong to.
+def rollup_day(ref: str) -> str:
+    return f"COALESCE(substr({ref}.work_datetime, 1, 10), '')"
+
+def rollup_work(ref: str, sign: int) -> str:
+    return f"""
+        INSERT INTO daily_totals(day, works_count, work_amount, work_tip, work_discount, work_grandtotal)
+        SELECT {rollup_day(ref)}, {sign}, {sign} * COALESCE({ref}.work_amount, 0), {sign} * COALESCE({ref}.work_tip, 0), {sign} * COALESCE({ref}.work_discount, 0), {sign} * COALESCE({ref}.work_grandtotal, 0) WHERE true
+        ON CONFLICT(day) DO UPDATE SET works_count = works_count + excluded.works_count, work_amount = work_amount + excluded.work_amount,
+            work_tip = work_tip + excluded.work_tip, work_discount = work_discount + excluded.work_discount, work_grandtotal = work_grandtotal + excluded.work_grandtotal;"""
+
+def rollup_detail(ref: str, sign: int) -> str:
+    return f"""
+        INSERT INTO daily_employee_totals(day, emp_id, details_count, emp_amount, emp_tip)
+        SELECT {rollup_day('w')}, COALESCE({ref}.emp_id, 0), {sign}, {sign} * COALESCE({ref}.emp_amount, 0), {sign} * COALESCE({ref}.emp_tip, 0) FROM works w WHERE w.work_id = {ref}.work_id
+        ON CONFLICT(day, emp_id) DO UPDATE SET details_count = details_count + excluded.details_count,
+            emp_amount = emp_amount + excluded.emp_amount, emp_tip = emp_tip + excluded.emp_tip;"""
+
+def rollup_payment(ref: str, sign: int) -> str:
+    return f"""
+        INSERT INTO daily_payment_totals(day, pmt_type, payments_count, pmt_amount)
+        SELECT {rollup_day('w')}, COALESCE({ref}.pmt_type, ''), {sign}, {sign} * COALESCE({ref}.pmt_amount, 0) FROM works w WHERE w.work_id = {ref}.work_id
+        ON CONFLICT(day, pmt_type) DO UPDATE SET payments_count = payments_count + excluded.payments_count, pmt_amount = pmt_amount + excluded.pmt_amount;"""
+
+def rollup_work_children(ref: str, sign: int) -> str:
+    # Moving or removing a work moves its already-recorded details and payments with it
+    return f"""
+        INSERT INTO daily_employee_totals(day, emp_id, details_count, emp_amount, emp_tip)
+        SELECT {rollup_day(ref)}, COALESCE(d.emp_id, 0), {sign} * COUNT(*), {sign} * TOTAL(d.emp_amount), {sign} * TOTAL(d.emp_tip) FROM emp_work_detail d WHERE d.work_id = {ref}.work_id GROUP BY 2
+        ON CONFLICT(day, emp_id) DO UPDATE SET details_count = details_count + excluded.details_count,
+            emp_amount = emp_amount + excluded.emp_amount, emp_tip = emp_tip + excluded.emp_tip;
+        INSERT INTO daily_payment_totals(day, pmt_type, payments_count, pmt_amount)
+        SELECT {rollup_day(ref)}, COALESCE(p.pmt_type, ''), {sign} * COUNT(*), {sign} * TOTAL(p.pmt_amount) FROM payments p WHERE p.work_id = {ref}.work_id GROUP BY 2
+        ON CONFLICT(day, pmt_type) DO UPDATE SET payments_count = payments_count + excluded.payments_count, pmt_amount = pmt_amount + excluded.pmt_amount;"""
+
+def rollup_triggers() -> str:
+    return f"""
+        CREATE TRIGGER trg_works_rollup_insert AFTER INSERT ON works BEGIN {rollup_work('NEW', 1)} {rollup_work_children('NEW', 1)}
+        END;
+        CREATE TRIGGER trg_works_rollup_update AFTER UPDATE ON works BEGIN {rollup_work('OLD', -1)} {rollup_work_children('OLD', -1)} {rollup_work('NEW', 1)} {rollup_work_children('NEW', 1)}
+        END;
+        CREATE TRIGGER trg_works_rollup_delete AFTER DELETE ON works BEGIN {rollup_work('OLD', -1)} {rollup_work_children('OLD', -1)}
+        END;
+        CREATE TRIGGER trg_detail_rollup_insert AFTER INSERT ON emp_work_detail BEGIN {rollup_detail('NEW', 1)}
+        END;
+        CREATE TRIGGER trg_detail_rollup_update AFTER UPDATE ON emp_work_detail BEGIN {rollup_detail('OLD', -1)} {rollup_detail('NEW', 1)}
+        END;
+        CREATE TRIGGER trg_detail_rollup_delete AFTER DELETE ON emp_work_detail BEGIN {rollup_detail('OLD', -1)}
+        END;
+        CREATE TRIGGER trg_payments_rollup_insert AFTER INSERT ON payments BEGIN {rollup_payment('NEW', 1)}
+        END;
+        CREATE TRIGGER trg_payments_rollup_update AFTER UPDATE ON payments BEGIN {rollup_payment('OLD', -1)} {rollup_payment('NEW', 1)}
+        END;
+        CREATE TRIGGER trg_payments_rollup_delete AFTER DELETE ON payments BEGIN {rollup_payment('OLD', -1)}
+        END;
+    """
+
+def rebuild_rollups_sql() -> str:
+    return f"""
+        DELETE FROM daily_totals;
+        DELETE FROM daily_employee_totals;
+        DELETE FROM daily_payment_totals;
+        INSERT INTO daily_totals(day, works_count, work_amount, work_tip, work_discount, work_grandtotal)
+        SELECT {rollup_day('w')}, COUNT(*), TOTAL(w.work_amount), TOTAL(w.work_tip), TOTAL(w.work_discount), TOTAL(w.work_grandtotal) FROM works w GROUP BY 1;
+        INSERT INTO daily_employee_totals(day, emp_id, details_count, emp_amount, emp_tip)
+        SELECT {rollup_day('w')}, COALESCE(d.emp_id, 0), COUNT(*), TOTAL(d.emp_amount), TOTAL(d.emp_tip) FROM emp_work_detail d JOIN works w ON w.work_id = d.work_id GROUP BY 1, 2;
+        INSERT INTO daily_payment_totals(day, pmt_type, payments_count, pmt_amount)
+        SELECT {rollup_day('w')}, COALESCE(p.pmt_type, ''), COUNT(*), TOTAL(p.pmt_amount) FROM payments p JOIN works w ON w.work_id = p.work_id GROUP BY 1, 2;
+    """
+
+# Tables whose every change bumps a counter in table_versions, so list endpoints can build
+# ETags from a single tiny read instead of hashing their results.
+VERSIONED_TABLES = ("employees", "works", "emp_work_detail", "payments")
+
+def table_version_triggers() -> str:
+    statements = [f"INSERT OR IGNORE INTO table_versions(table_name, version) VALUES('{table}', 0);" for table in VERSIONED_TABLES]
+    for table in VERSIONED_TABLES:
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            statements.append(f"""
+        CREATE TRIGGER trg_{table}_version_{event.lower()} AFTER {event} ON {table} BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE table_name = '{table}';
+        END;""")
+    return "\n".join(statements)
+
+# External-content FTS5 indexes over free-text columns: (fts table, source table, key, columns, options).
+# Notes use word tokens with prefix indexes; employees use trigrams so any 3+ character
+# fragment of a name or phone number matches.
+FTS_INDEXES = (
+    ("works_fts", "works", "work_id", ("work_notes",), "prefix='2 3'"),
+    ("details_fts", "emp_work_detail", "detail_id", ("detail_notes",), "prefix='2 3'"),
+    ("employees_fts", "employees", "emp_id", ("emp_name", "emp_phone"), "tokenize='trigram'"),
+)
+
+def fts_tables() -> str:
+    statements = []
+    for fts, table, key, columns, options in FTS_INDEXES:
+        cols = ", ".join(columns)
+        new = ", ".join(f"new.{c}" for c in columns)
+        old = ", ".join(f"old.{c}" for c in columns)
+        statements.append(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, content='{table}', content_rowid='{key}', {options});
+        CREATE TRIGGER trg_{fts}_insert AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts}(rowid, {cols}) VALUES(new.{key}, {new});
+        END;
+        CREATE TRIGGER trg_{fts}_delete AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {cols}) VALUES('delete', old.{key}, {old});
+        END;
+        CREATE TRIGGER trg_{fts}_update AFTER UPDATE OF {cols} ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {cols}) VALUES('delete', old.{key}, {old});
+            INSERT INTO {fts}(rowid, {cols}) VALUES(new.{key}, {new});
+        END;
+        INSERT INTO {fts}({fts}) VALUES('rebuild');""")
+    return "\n".join(statements)
+
+def normalize_work_datetimes(conn: sqlite3.Connection):
+    # Rewrite every work_datetime in canonical ISO-8601 so WORK_TS can read it. The rollup
+    # update trigger moves any work whose day changes; unreadable values are left alone.
+    updates = []
+    for work_id, value in conn.execute("SELECT work_id, work_datetime FROM works WHERE work_datetime IS NOT NULL AND work_datetime != ''").fetchall():
+        try:
+            normalized = normalize_datetime(value)
+        except ValueError:
+            logger.warning(f"Leaving unreadable work_datetime of work {work_id} as is: {value!r}")
+            continue
+        if normalized != value:
+            updates.append((normalized, work_id))
+    conn.executemany("UPDATE works SET work_datetime = ? WHERE work_id = ?", updates)
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_works_work_ts ON works({WORK_TS})")
+    conn.execute("DROP INDEX IF EXISTS idx_works_work_datetime")
+    logger.info(f"Normalized work_datetime of {len(updates)} works")
+
+# Versioned schema migrations, applied in order at startup. Each step is either a SQL
+# script or a callable taking the writer connection; the applied version is recorded in
+# PRAGMA user_version inside the same transaction as the step itself.
+MIGRATIONS = [
+    (1, "base tables", """
+        CREATE TABLE IF NOT EXISTS employees(
+            emp_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            emp_name VARCHAR(50),
+            emp_phone VARCHAR(10),
+            emp_ssn VARCHAR(10),
+            emp_address TEXT,
+            emp_work_percentage INTEGER,
+            emp_cash_percentage INTEGER,
+            emp_salary INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS works(
+            work_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            work_datetime TEXT,
+            work_amount REAL,
+            work_tip REAL,
+            work_discount REAL,
+            work_grandtotal REAL,
+            work_notes TEXT
+        );
+        CREATE TABLE IF NOT EXISTS emp_work_detail(
+            detail_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            work_id INTEGER,
+            emp_id INTEGER,
+            emp_amount REAL,
+            emp_tip REAL,
+            detail_notes TEXT
+        );
+        CREATE TABLE IF NOT EXISTS payments(
+            pmt_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            work_id INTEGER,
+            pmt_amount REAL,
+            pmt_type VARCHAR(10)
+        );
+    """),
+    (2, "indexes on hot lookup columns", """
+        CREATE INDEX IF NOT EXISTS idx_works_work_datetime ON works(work_datetime);
+        CREATE INDEX IF NOT EXISTS idx_detail_work_id ON emp_work_detail(work_id);
+        CREATE INDEX IF NOT EXISTS idx_detail_emp_work ON emp_work_detail(emp_id, work_id);
+        CREATE INDEX IF NOT EXISTS idx_payments_work_id ON payments(work_id);
+    """),
+    (3, "daily revenue, employee and payment rollups", """
+        CREATE TABLE IF NOT EXISTS daily_totals(
+            day TEXT PRIMARY KEY,
+            works_count INTEGER NOT NULL DEFAULT 0,
+            work_amount REAL NOT NULL DEFAULT 0,
+            work_tip REAL NOT NULL DEFAULT 0,
+            work_discount REAL NOT NULL DEFAULT 0,
+            work_grandtotal REAL NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS daily_employee_totals(
+            day TEXT NOT NULL,
+            emp_id INTEGER NOT NULL,
+            details_count INTEGER NOT NULL DEFAULT 0,
+            emp_amount REAL NOT NULL DEFAULT 0,
+            emp_tip REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY(day, emp_id)
+        );
+        CREATE TABLE IF NOT EXISTS daily_payment_totals(
+            day TEXT NOT NULL,
+            pmt_type TEXT NOT NULL DEFAULT '',
+            payments_count INTEGER NOT NULL DEFAULT 0,
+            pmt_amount REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY(day, pmt_type)
+        );
+    """ + rollup_triggers() + rebuild_rollups_sql()),
+    (4, "archive partition catalog", """
+        CREATE TABLE IF NOT EXISTS archive_partitions(
+            name TEXT PRIMARY KEY,
+            file TEXT NOT NULL,
+            from_day TEXT NOT NULL,
+            to_day TEXT NOT NULL,
+            min_work_id INTEGER,
+            max_work_id INTEGER,
+            min_detail_id INTEGER,
+            max_detail_id INTEGER,
+            min_pmt_id INTEGER,
+            max_pmt_id INTEGER,
+            works_count INTEGER NOT NULL DEFAULT 0,
+            details_count INTEGER NOT NULL DEFAULT 0,
+            payments_count INTEGER NOT NULL DEFAULT 0,
+            archived_at TEXT NOT NULL
+        );
+    """),
+    (5, "canonical work_datetime and integer range index", normalize_work_datetimes),
+    (6, "per-table change counters", """
+        CREATE TABLE IF NOT EXISTS table_versions(
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        );
+    """ + table_version_triggers()),
+    (7, "idempotency keys for retried POSTs", """
+        CREATE TABLE IF NOT EXISTS idempotency_keys(
+            idem_key TEXT PRIMARY KEY,
+            fingerprint TEXT NOT NULL,
+            status_code INTEGER,
+            body TEXT NOT NULL DEFAULT '',
+            created_at INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_idempotency_created_at ON idempotency_keys(created_at);
+    """),
+    (8, "full-text indexes on notes, employee names and phones", fts_tables()),
+]
+
+# Hot queries and the index each one must use: name -> (sql, sample params, index)
+HOT_QUERIES = {
+    "works_between_dates": (f"SELECT * FROM works WHERE {WORK_TS} BETWEEN ? AND ?", (0, 0), "idx_works_work_ts"),
+    "details_by_workids": ("SELECT * FROM emp_work_detail WHERE work_id IN (?, ?)", (0, 0), "idx_detail_work_id"),
+    "details_by_empid_workids": ("SELECT * FROM emp_work_detail WHERE emp_id = ? AND work_id IN (?, ?)", (0, 0, 0), "idx_detail_emp_work"),
+    "payments_by_workid": ("SELECT * FROM payments WHERE work_id = ?", (0,), "idx_payments_work_id"),
+}
+
+def split_statements(script: str) -> list[str]:
+    # complete_statement() understands trigger bodies, unlike a naive split on ";"
+    statements, buffer = [], ""
+    for line in script.splitlines(keepends=True):
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            statements.append(buffer.strip())
+            buffer = ""
+    if buffer.strip():
+        statements.append(buffer.strip())
+    return statements
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def run_migrations(conn: sqlite3.Connection, migrations=MIGRATIONS) -> int:
+    current = schema_version(conn)
+    for version, description, step in migrations:
+        if version <= current:
+            continue
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # Several workers start at once: whoever got the write lock first may have applied it
+            current = schema_version(conn)
+            if version <= current:
+                conn.rollback()
+                continue
+            if callable(step):
+                step(conn)
+            else:
+                for statement in split_statements(step):
+                    conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.error(f"Migration {version} ({description}) failed: {e}")
+            raise
+        current = version
+        logger.info(f"Applied migration {version}: {description}")
+    return current
+
+def register_hot_query(name: str, sql: str, params: tuple, index: str):
+    # For service modules whose queries database.py cannot import
+    HOT_QUERIES[name] = (sql, params, index)
+
+def verify_query_plans(conn: sqlite3.Connection, queries=HOT_QUERIES):
+    # EXPLAIN never checks the schema cookie: read sqlite_master first so indexes another
+    # worker created since this connection last loaded the schema are planned with
+    conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+    for name, (sql, params, index) in queries.items():
+        plan = " | ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+        if index not in plan:
+            logger.error(f"Hot query {name} does not use {index}: {plan}")
+            raise RuntimeError(f"Query plan regression: {name} does not use index {index} ({plan})")
+        # A sort materializes every row before the first one comes back
+        if "TEMP B-TREE" in plan:
+            logger.error(f"Hot query {name} sorts in a temp B-tree: {plan}")
+            raise RuntimeError(f"Query plan regression: {name} sorts in a temp B-tree ({plan})")
+
+# Configure connection pools with configurable DB path and sizing. Nothing is opened here:
+# startup() runs from the app's lifespan, once per uvicorn worker process.
+# Writes are serialized through one writer connection, reads go to a read-only pool.
 db_path = os.getenv('DATABASE_PATH', '../natural_nails.db')
-pool = ConnectionPool(12, db_path)
+# Pools are per worker; by default the 12 read connections are split between WEB_CONCURRENCY workers
+workers = max(1, int(os.getenv('WEB_CONCURRENCY', '1')))
+pool_size = max(1, int(os.getenv('DB_POOL_SIZE', str(max(2, 12 // workers)))))
+pool_timeout = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+pool_health_check = os.getenv('DB_POOL_HEALTH_CHECK', '1') != '0'
+profile = ConnectionProfile.from_env()
+
+write_pool = ConnectionPool(1, db_path, default_timeout=pool_timeout, health_check=pool_health_check, profile=profile)
+
+def migrate():
+    with write_pool.connection() as conn:
+        run_migrations(conn)
+        if os.getenv('DB_VERIFY_QUERY_PLANS', '1') != '0':
+            verify_query_plans(conn)
+
+read_pool = ConnectionPool(pool_size, db_path, default_timeout=pool_timeout, health_check=pool_health_check, profile=profile, readonly=True)
+executor = DatabaseExecutor(pool_size)
+if os.getenv('DB_GROUP_COMMIT', '0') != '0':
+    executor.group_writer = GroupCommitWriter(write_pool, window=float(os.getenv('DB_GROUP_COMMIT_WINDOW_MS', '2')) / 1000,
+                                              max_batch=max(1, int(os.getenv('DB_GROUP_COMMIT_MAX', '64'))))
+change_watcher = ChangeWatcher(db_path, float(os.getenv('DB_CHANGE_POLL_INTERVAL', '1')))
+backups = BackupManager(db_path, os.getenv('BACKUP_DIR', Path(db_path).resolve().parent / "backups"),
+                        step_pages=int(os.getenv('BACKUP_STEP_PAGES', '256')), step_sleep=float(os.getenv('BACKUP_STEP_SLEEP_MS', '50')) / 1000,
+                        keep=max(1, int(os.getenv('BACKUP_KEEP', '7'))), compress=os.getenv('BACKUP_COMPRESS', '0') != '0',
+                        interval=float(os.getenv('BACKUP_INTERVAL_HOURS', '0')) * 3600)
+
+def after_commit(callback):
+    """Run callback once the current write is committed: right away, or after its group commit."""
+    batch = getattr(write_pool.local, "batch", None)
+    if batch is None:
+        callback()
+    else:
+        batch.callbacks.append(callback)
+
+@contextmanager
+def write_transaction():
+    """Run a service-layer write and statements of its own as one transaction. Writer thread only.
+
+    Inside the block write_pool.connection() hands out the yielded BatchConnection, so the
+    service's commit() or rollback() only releases or rolls back the block's savepoint. The
+    block COMMITs when it exits normally and rolls back everything on an exception. Its
+    after-commit callbacks run after the COMMIT.
+    """
+    with write_pool.connection() as conn:
+        proxy = BatchConnection(conn)
+        write_pool.local.batch = proxy
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            proxy.begin_job()
+            yield proxy
+            proxy.commit()
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            proxy.callbacks.clear()
+            raise
+        finally:
+            write_pool.local.batch = None
+    run_callbacks(proxy.callbacks)
+
+def startup():
+    """Open this worker's pools, bring the schema up to date and start watching for other workers' writes."""
+    write_pool.open()
+    migrate()
+    read_pool.open()
+    executor.start()
+    change_watcher.start()
+    backups.start()
+
+def shutdown():
+    backups.stop()
+    change_watcher.stop()
+    executor.shutdown()
+    read_pool.close()
+    write_pool.close()
+
+metrics.register_gauge("nails_db_pool_in_use", "Connections currently checked out", ("pool",),
+                       lambda: {(p.name,): p.stats()["in_use"] for p in (read_pool, write_pool)})
+metrics.register_gauge("nails_db_pool_size", "Connections in the pool", ("pool",),
+                       lambda: {(p.name,): p.max_connections for p in (read_pool, write_pool)})
+metrics.register_gauge("nails_db_backup_age_seconds", "Seconds since the newest finished backup", (),
+                       lambda: {(): round(time.time() - (backups.directory / f[0].name).stat().st_mtime)} if (f := backups.files()) else {})
+
+def select_table_versions(tables: tuple[str, ...] = VERSIONED_TABLES) -> dict[str, int]:
+    with read_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT table_name, version FROM table_versions WHERE table_name IN ({placeholders(len(tables))})", tables)
+        return dict(cursor.fetchall())
+
+def health() -> dict:
+    with read_pool.connection() as conn:
+        version = schema_version(conn)
+    return {"database": db_path, "pid": os.getpid(), "schema_version": version, "read_pool": read_pool.stats(), "write_pool": write_pool.stats(), "read_workers": executor.read_workers}
@@ -0,0 +1,61 @@
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+import os
+
+# works.work_datetime holds the shop's local wall-clock time as canonical ISO-8601
+# (YYYY-MM-DDTHH:MM:SS). Timezone-aware input is converted to SHOP_TIMEZONE, or to the
+# server's local zone when it is not set, so every ticket lands on the day it happened.
+shop_timezone = ZoneInfo(os.environ['SHOP_TIMEZONE']) if os.getenv('SHOP_TIMEZONE') else None
+
+# Seconds since 1970-01-01T00:00:00 of the stored wall-clock time. Range queries compare this
+# expression, and it must stay identical to the one idx_works_work_ts is built on.
+WORK_TS = "CAST(strftime('%s', work_datetime) AS INTEGER)"
+
+EPOCH = datetime(1970, 1, 1)
+SECONDS_PER_DAY = 86400
+
+# Layouts written by older clients, tried when the value is not ISO-8601
+LEGACY_FORMATS = ("%Y-%m-%dT%H-%M-%S", "%Y-%m-%d %H-%M-%S", "%Y/%m/%d %H:%M:%S", "%Y/%m/%d %H:%M", "%Y/%m/%d",
+                  "%m/%d/%Y %H:%M:%S", "%m/%d/%Y %H:%M", "%m/%d/%Y")
+
+def parse_datetime(value: str | datetime) -> datetime:
+    """Parse ISO-8601 (any offset) or a legacy layout into a naive shop-local datetime."""
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        text = value.strip()
+        try:
+            parsed = datetime.fromisoformat(text)
+        except ValueError:
+            for layout in LEGACY_FORMATS:
+                try:
+                    parsed = datetime.strptime(text, layout)
+                    break
+                except ValueError:
+                    continue
+            else:
+                raise ValueError(f"Unrecognized date/time: {value!r}")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(shop_timezone).replace(tzinfo=None)
+    return parsed.replace(microsecond=0)
+
+def normalize_datetime(value: str | datetime) -> str:
+    return parse_datetime(value).isoformat(timespec="seconds")
+
+def to_epoch(value: datetime) -> int:
+    # Same numbering as WORK_TS: the wall-clock time read as if it were UTC
+    return int((value - EPOCH).total_seconds())
+
+def epoch_day(seconds: int) -> str:
+    return (EPOCH + timedelta(seconds=seconds)).date().isoformat()
+
+def epoch_range(from_value: str, to_value: str) -> tuple[int, int]:
+    """Inclusive WORK_TS bounds for a range; a date-only upper bound covers that whole day."""
+    start = to_epoch(parse_datetime(from_value))
+    end = to_epoch(parse_datetime(to_value))
+    try:
+        date.fromisoformat(to_value.strip())
+        end += SECONDS_PER_DAY - 1
+    except ValueError:
+        pass
+    return start, end
@@ -1,6 +1,8 @@
 from sqlite3 import Error
 from typing import Any
-from service.database import pool
+from service.database import read_pool, write_pool, iter_batches, chunked, placeholders
+from service import archive, events
+from functools import partial
 from pydantic import BaseModel, field_validator
 import logging
 
@@ -21,6 +23,9 @@ class Detail(BaseModel):
             raise ValueError('Amounts cannot be negative')
         return v
 
+class WorkIdsRequest(BaseModel):
+    work_ids: list[int] = []
+
 def getDefaultDetail() -> Detail:
     return Detail(detail_id=-1, work_id=0, emp_id=0, emp_amount=0, emp_tip=0, detail_notes="")
     
@@ -28,59 +33,72 @@ def getDefaultDetail() -> Detail:
 def row_to_detail(row: list[Any]):
     return Detail(detail_id=row[0], work_id=row[1], emp_id=row[2], emp_amount=row[3], emp_tip=row[4], detail_notes=row[5])
 
-def list_to_detail(rows: list[Any]):
-    return [row_to_detail(row) for row in rows]
+DETAIL_COLUMNS = ("detail_id", "work_id", "emp_id", "emp_amount", "emp_tip", "detail_notes")
+
+# Fast read path for lists: rows were validated on their way into the database, so
+# decode them straight to dicts instead of building and validating a model per row
+def list_to_detail(rows: list[Any]) -> list[dict[str, Any]]:
+    return [dict(zip(DETAIL_COLUMNS, row)) for row in rows]
 
-# GET all emp_work_detail
-def select_all_detail() -> list[Detail]:
-    with pool.connection() as conn:
+# GET all emp_work_detail, keyset-paginated on detail_id (limit=None returns everything after after_id)
+def select_all_detail(after_id: int = 0, limit: int | None = None) -> list[dict[str, Any]]:
+    with read_pool.connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM emp_work_detail")
+        cursor.execute(*archive.routed_query(conn, "emp_work_detail", "detail_id > ?", (after_id,), order_by="detail_id", limit=limit or -1, key="detail", after_id=after_id))
         output = cursor.fetchall()
-
+    
     return list_to_detail(output)
 
+# Stream all emp_work_detail in batches of row dicts, for NDJSON responses
+def iter_all_detail(after_id: int = 0, limit: int | None = None):
+    for rows in iter_batches(partial(archive.routed_query, table="emp_work_detail", where="detail_id > ?", params=(after_id,), order_by="detail_id", limit=limit or -1, key="detail", after_id=after_id)):
+        yield list_to_detail(rows)
+
 # GET emp_work_detail by ID
 def select_detail_id(id: int) -> Detail:
-    with pool.connection() as conn:
+    with read_pool.connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM emp_work_detail WHERE detail_id = ?", (id,))
+        cursor.execute(*archive.routed_query(conn, "emp_work_detail", "detail_id = ?", (id,), key="detail", ids=[id]))
         output = cursor.fetchone()
 
     return row_to_detail(output) if output else getDefaultDetail()
 
-# GET emp_work_detail by list of work_id(s):
-def select_detail_workdids(work_ids: str) -> list[Detail]:
-    with pool.connection() as conn:
+# GET emp_work_detail by list of work_id(s), one query per chunk of ids:
+def select_detail_workdids(work_ids: list[int]) -> list[dict[str, Any]]:
+    output = []
+    with read_pool.connection() as conn:
         cursor = conn.cursor()
-
-        cursor.execute("SELECT * FROM emp_work_detail WHERE work_id IN (?)", (work_ids.replace('-', ','),))
-        output = cursor.fetchall()
+        for chunk in chunked(work_ids):
+            cursor.execute(*archive.routed_query(conn, "emp_work_detail", f"work_id IN ({placeholders(len(chunk))})", chunk, key="work", ids=chunk))
+            output.extend(cursor.fetchall())
     
     return list_to_detail(output)
 
 # GET emp_work_detail by emp_id and list of work_id(s):
-def select_detail_empid_workids(emp_id: int, work_ids: str) -> list[Detail]:
-    with pool.connection() as conn:
+def select_detail_empid_workids(emp_id: int, work_ids: list[int]) -> list[dict[str, Any]]:
+    output = []
+    with read_pool.connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM emp_work_detail WHERE emp_id = ? AND work_id IN (?)", (emp_id, work_ids.replace('-', ',')))
-        output = cursor.fetchall()
+        for chunk in chunked(work_ids):
+            cursor.execute(*archive.routed_query(conn, "emp_work_detail", f"emp_id = ? AND work_id IN ({placeholders(len(chunk))})", (emp_id, *chunk), key="work", ids=chunk))
+            output.extend(cursor.fetchall())
     
     return list_to_detail(output)
 
 # POST / create new emp_work_detail
 def create_new_detail(new_detail: Detail) -> Detail:
-    with pool.connection() as conn:
+    with write_pool.connection() as conn:
         cursor = conn.cursor()
 
         try:
-            cursor.execute("INSERT INTO emp_work_detail(detail_id, work_id, emp_id, emp_amount, emp_tip, detail_notes) VALUES(?, ?, ?, ?, ?, ?)",
-                        (new_detail.detail_id, new_detail.work_id, new_detail.emp_id, new_detail.emp_amount, new_detail.emp_tip, new_detail.detail_notes))
-            cursor.execute("SELECT detail_id FROM emp_work_detail ORDER BY detail_id DESC LIMIT 1")
-            new_detail.work_id = cursor.fetchone()[0]
+            cursor.execute("INSERT INTO emp_work_detail(work_id, emp_id, emp_amount, emp_tip, detail_notes) VALUES(?, ?, ?, ?, ?)",
+                        (new_detail.work_id, new_detail.emp_id, new_detail.emp_amount, new_detail.emp_tip, new_detail.detail_notes))
+            new_detail.detail_id = cursor.lastrowid
             conn.commit()
+            logger.info(f"Detail created: {new_detail.detail_id} for work {new_detail.work_id}")
+            events.publish("details", "created", new_detail)
         except Error as e:
-            print(e)
+            logger.error(f"Database error creating detail: {e}")
             conn.rollback()
             return getDefaultDetail()
         
@@ -88,40 +106,42 @@ def create_new_detail(new_detail: Detail) -> Detail:
 
 # PUT / update existing emp_work_detail
 def update_existing_detail(exist_detail: Detail) -> Detail:
-    with pool.connection() as conn:
+    with write_pool.connection() as conn:
         cursor = conn.cursor()
 
         try:
-            found_detail = select_detail_id(exist_detail.detail_id)
-            if found_detail != -1:
-                cursor.execute("UPDATE emp_work_detail SET work_id=?, emp_id=?, emp_amount=?, emp_tip=?, detail_notes=? WHERE detail_id=?",
-                            (exist_detail.work_id, exist_detail.emp_id, exist_detail.emp_amount, exist_detail.emp_tip, exist_detail.detail_notes, exist_detail.detail_id))
-                conn.commit()
-            else:
+            cursor.execute("UPDATE emp_work_detail SET work_id=?, emp_id=?, emp_amount=?, emp_tip=?, detail_notes=? WHERE detail_id=? RETURNING *",
+                        (exist_detail.work_id, exist_detail.emp_id, exist_detail.emp_amount, exist_detail.emp_tip, exist_detail.detail_notes, exist_detail.detail_id))
+            updated = cursor.fetchone()
+            if updated is None:
                 raise Error(f"detail_id={exist_detail.detail_id} cannot be found in table:emp_work_detail")
+            conn.commit()
+            logger.info(f"Detail updated: {exist_detail.detail_id}")
+            events.publish("details", "updated", row_to_detail(updated))
         except Error as e:
-            print(e)
+            logger.error(f"Database error updating detail {exist_detail.detail_id}: {e}")
             conn.rollback()
             return getDefaultDetail()
     
-    return exist_detail
+    return row_to_detail(updated)
 
 # DELETE existing detail by ID
 def delete_existing_detail(exist_detail_id: int) -> Detail:
-    with pool.connection() as conn:
+    with write_pool.connection() as conn:
         cursor = conn.cursor()
 
         try:
-            found_detail = select_detail_id(exist_detail_id)
-            if found_detail.work_id != -1:
-                cursor.execute("DELETE FROM emp_work_detail WHERE detail_id=?", (exist_detail_id,))
-                conn.commit()
-            else:
+            cursor.execute("DELETE FROM emp_work_detail WHERE detail_id=? RETURNING *", (exist_detail_id,))
+            deleted = cursor.fetchone()
+            if deleted is None:
                 raise Error(f"detail_id={exist_detail_id} cannot be found in table:emp_work_detail")
+            conn.commit()
+            logger.info(f"Detail deleted: {exist_detail_id}")
+            events.publish("details", "deleted", row_to_detail(deleted))
         except Error as e:
-            print(e)
+            logger.error(f"Database error deleting detail {exist_detail_id}: {e}")
             conn.rollback()
             return getDefaultDetail()
     
-    return found_detail
+    return row_to_detail(deleted)
     
\ No newline at end of file
@@ -1,11 +1,19 @@
 from typing import Any
-from service.database import pool
+from service.database import read_pool, write_pool, iter_batches, change_watcher
+from service.cache import ReadThroughCache
 from sqlite3 import Error
 from pydantic import BaseModel, field_validator
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
+# The roster changes rarely: reads are served from memory until the TTL runs out
+# or one of the write paths below invalidates the cache
+employee_cache = ReadThroughCache("employees", ttl=float(os.getenv('EMPLOYEE_CACHE_TTL', '300')))
+# Writes handled by other uvicorn workers invalidate it too, within DB_CHANGE_POLL_INTERVAL
+change_watcher.on_change("employees", lambda steps: employee_cache.invalidate())
+
 class Employee(BaseModel):
     emp_id: int = -1
     emp_name: str = ""
@@ -37,40 +45,59 @@ def getDefaultEmployee():
 def row_to_employee(row: list[Any]):
     return Employee(emp_id=row[0], emp_name=row[1], emp_phone=row[2], emp_ssn=row[3], emp_address=row[4], emp_work_percentage=row[5], emp_cash_percentage=row[6], emp_salary=row[7])
 
-def list_to_employees(rows: list[Any]):
-    return [row_to_employee(row) for row in rows]
+EMPLOYEE_COLUMNS = ("emp_id", "emp_name", "emp_phone", "emp_ssn", "emp_address", "emp_work_percentage", "emp_cash_percentage", "emp_salary")
 
-# GET all employees
-def select_all_employees() -> list[Employee]:
-    with pool.connection() as conn:
-        cursor = conn.cursor()
+# Fast read path for lists: rows were validated on their way into the database, so
+# decode them straight to dicts instead of building and validating a model per row
+def list_to_employees(rows: list[Any]) -> list[dict[str, Any]]:
+    return [dict(zip(EMPLOYEE_COLUMNS, row)) for row in rows]
 
-        cursor.execute("SELECT * FROM employees")
-        output = cursor.fetchall()
-    
-    return list_to_employees(output)
+# GET all employees, keyset-paginated on emp_id (limit=None returns everything after after_id)
+def select_all_employees(after_id: int = 0, limit: int | None = None) -> list[dict[str, Any]]:
+    def load():
+        with read_pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM employees WHERE emp_id > ? ORDER BY emp_id LIMIT ?", (after_id, limit or -1))
+            output = cursor.fetchall()
+        return list_to_employees(output)
+
+    return employee_cache.get(("all", after_id, limit), load)
+
+# ETag of the cached page, or None when it has to be loaded again
+def all_employees_etag(after_id: int = 0, limit: int | None = None) -> str | None:
+    return employee_cache.etag(("all", after_id, limit))
+
+# Stream all employees in batches of row dicts, for NDJSON responses
+def iter_all_employees(after_id: int = 0, limit: int | None = None):
+    for rows in iter_batches("SELECT * FROM employees WHERE emp_id > ? ORDER BY emp_id LIMIT ?", (after_id, limit or -1)):
+        yield list_to_employees(rows)
 
 # GET Employee by ID
 def select_employee_id(id: int) -> Employee:
-    with pool.connection() as conn:
-        cursor = conn.cursor()
+    def load():
+        with read_pool.connection() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute("SELECT * FROM employees WHERE emp_id = ?", (id,))
+            output = cursor.fetchone()
+        return row_to_employee(output) if output else getDefaultEmployee()
 
-        cursor.execute("SELECT * FROM employees WHERE emp_id = ?", (id,))
-        output = cursor.fetchone()
+    return employee_cache.get(("id", id), load)
 
-    return row_to_employee(output) if output else getDefaultEmployee()
+def employee_etag(id: int) -> str | None:
+    return employee_cache.etag(("id", id))
 
 # POST new Employee
 def create_new_employee(new_emp: Employee) -> Employee:
-    with pool.connection() as conn:
+    with write_pool.connection() as conn:
         cursor = conn.cursor()
 
         try:
             cursor.execute("INSERT INTO employees(emp_name, emp_phone, emp_ssn, emp_address, emp_work_percentage, emp_cash_percentage, emp_salary) VALUES(?, ?, ?, ?, ?, ?, ?)",
                         (new_emp.emp_name, new_emp.emp_phone, new_emp.emp_ssn, new_emp.emp_address, new_emp.emp_work_percentage, new_emp.emp_cash_percentage, new_emp.emp_salary))
-            cursor.execute("SELECT emp_id FROM employees ORDER BY emp_id DESC LIMIT 1")
-            new_emp.emp_id = cursor.fetchone()[0]
+            new_emp.emp_id = cursor.lastrowid
             conn.commit()
+            employee_cache.invalidate()
             logger.info(f"Employee created: {new_emp.emp_id} - {new_emp.emp_name}")
         except Error as e:
             logger.error(f"Database error creating employee: {e}")
@@ -81,41 +108,41 @@ def create_new_employee(new_emp: Employee) -> Employee:
 
 # PUT existing Employee
 def update_existing_employee(exist_emp: Employee) -> Employee:
-    with pool.connection() as conn:
+    with write_pool.connection() as conn:
         cursor = conn.cursor()
 
         try:
-            found_emp = select_employee_id(exist_emp.emp_id)
-            if found_emp.emp_id != -1:
-                cursor.execute("UPDATE employees SET emp_name=?, emp_phone=?, emp_ssn=?, emp_address=?, emp_work_percentage=?, emp_cash_percentage=?, emp_salary=? WHERE emp_id=?",
-                            (exist_emp.emp_name, exist_emp.emp_phone, exist_emp.emp_ssn, exist_emp.emp_address, exist_emp.emp_work_percentage, exist_emp.emp_cash_percentage, exist_emp.emp_salary, exist_emp.emp_id))
-                conn.commit()
-                logger.info(f"Employee updated: {exist_emp.emp_id}")
-            else:
-                raise Error(f"emp_id={found_emp.emp_id} cannot be found in table:employees")
+            cursor.execute("UPDATE employees SET emp_name=?, emp_phone=?, emp_ssn=?, emp_address=?, emp_work_percentage=?, emp_cash_percentage=?, emp_salary=? WHERE emp_id=? RETURNING *",
+                        (exist_emp.emp_name, exist_emp.emp_phone, exist_emp.emp_ssn, exist_emp.emp_address, exist_emp.emp_work_percentage, exist_emp.emp_cash_percentage, exist_emp.emp_salary, exist_emp.emp_id))
+            updated = cursor.fetchone()
+            if updated is None:
+                raise Error(f"emp_id={exist_emp.emp_id} cannot be found in table:employees")
+            conn.commit()
+            employee_cache.invalidate()
+            logger.info(f"Employee updated: {exist_emp.emp_id}")
         except Error as e:
             logger.error(f"Database error updating employee {exist_emp.emp_id}: {e}")
             conn.rollback()
             return getDefaultEmployee()
     
-    return exist_emp
+    return row_to_employee(updated)
 
 # DELETE existing employee by ID
 def delete_existing_employee(exist_emp_id: int) -> Employee:
-    with pool.connection() as conn:
+    with write_pool.connection() as conn:
         cursor = conn.cursor()
 
         try:
-            found_emp = select_employee_id(exist_emp_id)
-            if found_emp.emp_id != -1:
-                cursor.execute("DELETE FROM employees WHERE emp_id=?", (exist_emp_id,))
-                conn.commit()
-                logger.info(f"Employee deleted: {exist_emp_id}")
-            else:
-                raise Error(f"emp_id={found_emp.emp_id} cannot be found in table:employees")
+            cursor.execute("DELETE FROM employees WHERE emp_id=? RETURNING *", (exist_emp_id,))
+            deleted = cursor.fetchone()
+            if deleted is None:
+                raise Error(f"emp_id={exist_emp_id} cannot be found in table:employees")
+            conn.commit()
+            employee_cache.invalidate()
+            logger.info(f"Employee deleted: {exist_emp_id}")
         except Error as e:
             logger.error(f"Database error deleting employee {exist_emp_id}: {e}")
             conn.rollback()
             return getDefaultEmployee()
     
-    return found_emp
\ No newline at end of file
+    return row_to_employee(deleted)
\ No newline at end of file
@@ -0,0 +1,156 @@
+from collections import deque
+from functools import partial
+from itertools import count
+from pydantic import BaseModel
+from pydantic_core import to_json
+from service.database import after_commit, change_watcher
+import asyncio
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Change events for open dashboards. Service-layer writes publish after they commit, from
+# whichever executor thread ran them; every subscriber owns a bounded queue on the event loop
+# that serves its /events stream.
+EVENTS_QUEUE_SIZE = int(os.getenv('EVENTS_QUEUE_SIZE', '256'))
+
+TOPICS = ("works", "details", "payments", "tickets")
+# Topics fed by each table, for writes this process only learns about from change_watcher
+TABLE_TOPICS = {"works": {"works", "tickets"}, "emp_work_detail": {"details", "tickets"}, "payments": {"payments", "tickets"}}
+TOPIC_TABLES = {"works": "works", "details": "emp_work_detail", "payments": "payments"}
+
+# Event ids are "<epoch>-<sequence>". The epoch is unique to this process, so a Last-Event-ID
+# handed out by another worker, or before a restart, never matches and always resyncs.
+EPOCH = f"{int(time.time() * 1000):x}{os.getpid():x}"
+
+class Event(BaseModel):
+    id: str
+    topic: str
+    action: str
+    data: str  # JSON, serialized once however many clients receive it
+
+    def to_sse(self) -> bytes:
+        return f"id: {self.id}\nevent: {self.topic}.{self.action}\ndata: {self.data}\n\n".encode()
+
+def resync_event(event_id: str, topics: set[str]) -> Event:
+    return Event(id=event_id, topic="stream", action="resync", data=to_json({"topics": sorted(topics)}).decode())
+
+class Subscription:
+    """One client's view of the broker: a bounded queue filtered to the topics it asked for.
+
+    A client that falls EVENTS_QUEUE_SIZE events behind is not allowed to hold up writers or
+    grow memory: its backlog is dropped and replaced by a single `resync` event, after which
+    the dashboard re-fetches its lists and carries on from live events.
+    """
+    def __init__(self, loop: asyncio.AbstractEventLoop, topics: set[str], maxsize: int):
+        self.loop = loop
+        self.topics = topics
+        self.queue: asyncio.Queue[Event] = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def offer(self, event: Event):
+        # Always runs on self.loop
+        if self.queue.full():
+            self.dropped += self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(resync_event(event.id, self.topics))
+            return
+        self.queue.put_nowait(event)
+
+    async def get(self) -> Event:
+        return await self.queue.get()
+
+class EventBroker:
+    def __init__(self, maxsize: int = EVENTS_QUEUE_SIZE):
+        self.maxsize = maxsize
+        self.subscriptions: set[Subscription] = set()
+        self.lock = threading.Lock()
+        self.ids = count(1)
+        self.last_id = f"{EPOCH}-0"
+        # When this process published each of its recent row events, per table. change_watcher
+        # also reports our own writes: rows covered by these are not another worker's.
+        self.local_writes: dict[str, deque[float]] = {table: deque() for table in TABLE_TOPICS}
+
+    def next_id(self) -> str:
+        # Under self.lock
+        self.last_id = f"{EPOCH}-{next(self.ids)}"
+        return self.last_id
+
+    def subscribe(self, topics: set[str] | None = None) -> Subscription:
+        # Called from the event loop that will consume the queue
+        subscription = Subscription(asyncio.get_running_loop(), topics or set(TOPICS), self.maxsize)
+        with self.lock:
+            self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self.lock:
+            self.subscriptions.discard(subscription)
+        if subscription.dropped:
+            logger.info(f"Event subscriber left after {subscription.dropped} events were dropped for falling behind")
+
+    def publish(self, topic: str, action: str, data: BaseModel | dict | list):
+        """Queue an event for every subscriber of topic. Safe to call from any thread."""
+        with self.lock:
+            # Every write takes an id, watched or not: a dashboard that reconnects after writes
+            # made while nobody was subscribed must see its Last-Event-ID as stale
+            event_id = self.next_id()
+            if not self.subscriptions:
+                return
+            event = Event(id=event_id, topic=topic, action=action, data=to_json(data).decode())
+            targets = [s for s in self.subscriptions if topic in s.topics]
+        self.deliver(targets, event)
+
+    def record_local_write(self, topic: str):
+        if topic in TOPIC_TABLES and change_watcher.interval > 0:
+            with self.lock:
+                self.local_writes[TOPIC_TABLES[topic]].append(time.monotonic())
+
+    def resync(self, topics: set[str]):
+        """Tell subscribers of any of topics to re-fetch: rows changed that no event describes."""
+        with self.lock:
+            event_id = self.next_id()
+            if not self.subscriptions:
+                return
+            event = resync_event(event_id, topics)
+            targets = [s for s in self.subscriptions if s.topics & topics]
+        self.deliver(targets, event)
+
+    def table_changed(self, table: str, steps: int):
+        """change_watcher callback: resync the table's topics unless our own events cover every row."""
+        # A credit older than a couple of polls belongs to a change already reported
+        horizon = time.monotonic() - 2 * change_watcher.interval - 1
+        with self.lock:
+            credits = self.local_writes[table]
+            while credits and credits[0] < horizon:
+                credits.popleft()
+            own = min(steps, len(credits))
+            for _ in range(own):
+                credits.popleft()
+        if steps > own:
+            logger.info(f"{steps - own} changes to {table} made elsewhere, asking subscribers to resync")
+            self.resync(TABLE_TOPICS[table])
+
+    def deliver(self, targets: list[Subscription], event: Event):
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:
+                # The subscriber's loop has shut down
+                self.unsubscribe(subscription)
+
+broker = EventBroker()
+# Writes handled by other uvicorn workers (or made outside the app) become resyncs here
+for _table in TABLE_TOPICS:
+    change_watcher.on_change(_table, partial(broker.table_changed, _table))
+
+def publish(topic: str, action: str, data: BaseModel | dict | list):
+    # Credited right away, before change_watcher can see the row: under group commit the
+    # write only becomes visible with the batch's COMMIT, and the event follows it
+    broker.record_local_write(topic)
+    # Under group commit the write is not durable yet when the service function returns
+    after_commit(partial(broker.publish, topic, action, data))
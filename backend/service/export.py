@@ -0,0 +1,168 @@
+from typing import Iterator, Literal
+from service.database import iter_batches, register_hot_query
+from service.datetimes import WORK_TS, epoch_range
+from service.works import WORKS_COLUMNS
+from service.emp_work_detail import DETAIL_COLUMNS
+from service.payments import PAYMENTS_COLUMNS
+from service import archive
+from contextlib import closing
+from functools import partial
+import csv
+import io
+import logging
+import os
+
+# pyarrow is optional: without it only CSV exports are available
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+# Accounting exports stream straight from the cursor: rows are pulled with fetchmany and
+# encoded batch by batch, so a year of tickets never sits in memory as one list. Works
+# moved to archive files are included, like in every other date-range read.
+EXPORT_ROW_GROUP_SIZE = int(os.getenv('EXPORT_ROW_GROUP_SIZE', '50000'))
+CSV_BATCH_SIZE = 1000
+
+Dataset = Literal["works", "details", "payments", "joined"]
+Format = Literal["csv", "parquet", "arrow"]
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+IN_RANGE = f"{WORK_TS} BETWEEN ? AND ?"
+# Rows come out in time order. Every query ends with hidden sort keys, stripped by iter_rows:
+# the work's WORK_TS and work_id, then the child row's id. Sorting on them lets
+# idx_works_work_ts drive each scan and main's and the archives' branches merge as they
+# stream, so SQLite never sorts the whole period before the first chunk.
+WORK_SORT = f"{WORK_TS}, w.work_id"
+
+# Joined layout: one line per detail and one per payment, each carrying its work, so the
+# works + details + payments of a period come out of a single ordered scan. Joining both
+# children in one SELECT would repeat every payment once per detail; a work without
+# details still gets its own 'work' line.
+JOINED_COLUMNS = (*WORKS_COLUMNS, "line_type", "detail_id", "emp_id", "emp_name", "emp_amount", "emp_tip", "detail_notes",
+                  "pmt_id", "pmt_amount", "pmt_type")
+JOINED_QUERY = f"""
+    SELECT w.*, CASE WHEN d.detail_id IS NULL THEN 'work' ELSE 'detail' END, d.detail_id, d.emp_id, e.emp_name,
+           d.emp_amount, d.emp_tip, d.detail_notes, NULL, NULL, NULL, {WORK_SORT}, 0, d.detail_id
+    FROM {{schema}}.works w
+    LEFT JOIN {{schema}}.emp_work_detail d ON d.work_id = w.work_id
+    LEFT JOIN main.employees e ON e.emp_id = d.emp_id
+    WHERE {IN_RANGE}
+    UNION ALL
+    SELECT w.*, 'payment', NULL, NULL, NULL, NULL, NULL, NULL, p.pmt_id, p.pmt_amount, p.pmt_type, {WORK_SORT}, 1, p.pmt_id
+    FROM {{schema}}.works w JOIN {{schema}}.payments p ON p.work_id = w.work_id
+    WHERE {IN_RANGE}"""
+
+# dataset: (columns, query over {schema}, number of IN_RANGE placeholder pairs, number of sort keys)
+DATASETS = {
+    "works": (WORKS_COLUMNS, f"SELECT w.*, {WORK_SORT} FROM {{schema}}.works w WHERE {IN_RANGE}", 1, 2),
+    "details": ((*DETAIL_COLUMNS, "work_datetime"),
+                f"SELECT d.*, w.work_datetime, {WORK_SORT}, d.detail_id FROM {{schema}}.emp_work_detail d JOIN {{schema}}.works w ON w.work_id = d.work_id WHERE {IN_RANGE}",
+                1, 3),
+    "payments": ((*PAYMENTS_COLUMNS, "work_datetime"),
+                 f"SELECT p.*, w.work_datetime, {WORK_SORT}, p.pmt_id FROM {{schema}}.payments p JOIN {{schema}}.works w ON w.work_id = p.work_id WHERE {IN_RANGE}",
+                 1, 3),
+    # Per work: its details (or its 'work' line), then its payments
+    "joined": (JOINED_COLUMNS, JOINED_QUERY, 2, 4),
+}
+
+INTEGER_COLUMNS = {"work_id", "detail_id", "emp_id", "pmt_id"}
+REAL_COLUMNS = {"work_amount", "work_tip", "work_discount", "work_grandtotal", "emp_amount", "emp_tip", "pmt_amount"}
+
+def arrow_available() -> bool:
+    return pyarrow is not None
+
+def columns(dataset: str) -> tuple[str, ...]:
+    return DATASETS[dataset][0]
+
+def arrow_schema(names: tuple[str, ...]):
+    return pyarrow.schema([(name, pyarrow.int64() if name in INTEGER_COLUMNS else pyarrow.float64() if name in REAL_COLUMNS else pyarrow.string())
+                           for name in names])
+
+def export_sql(dataset: str, start: int, end: int, parts: list) -> tuple[str, tuple]:
+    names, template, ranges, sort_keys = DATASETS[dataset]
+    order_by = ", ".join(str(len(names) + i) for i in range(1, sort_keys + 1))
+    return archive.union_query(template, (start, end) * ranges, parts, order_by=order_by)
+
+def export_query(conn, dataset: str, from_day: str, to_day: str) -> tuple[str, tuple]:
+    start, end = epoch_range(from_day, to_day)
+    return export_sql(dataset, start, end, archive.route(conn, from_day=from_day, to_day=to_day))
+
+def iter_rows(dataset: str, from_day: str, to_day: str, batch_size: int):
+    width = len(columns(dataset))
+    with closing(iter_batches(partial(export_query, dataset=dataset, from_day=from_day, to_day=to_day), batch_size=batch_size)) as batches:
+        for rows in batches:
+            yield [row[:width] for row in rows]
+
+# Checked at startup like database.HOT_QUERIES: the time-ordered scan must not fall back to a sort
+for _dataset in DATASETS:
+    register_hot_query(f"export_{_dataset}", *export_sql(_dataset, 0, 0, []), "idx_works_work_ts")
+
+class ChunkSink(io.RawIOBase):
+    """Write-only file that hands its bytes back in pieces, for writers that need a file object."""
+    def __init__(self):
+        self.chunks: list[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    # Parquet records column chunk offsets from tell(), so it counts every byte ever written
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+def iter_csv(dataset: str, from_day: str, to_day: str) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns(dataset))
+    for rows in iter_rows(dataset, from_day, to_day, CSV_BATCH_SIZE):
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only, for an empty period
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+def record_batch(rows: list[tuple], schema):
+    return pyarrow.RecordBatch.from_arrays([pyarrow.array(values, type=field.type) for values, field in zip(zip(*rows), schema)], schema=schema)
+
+def iter_arrow(dataset: str, fmt: str, from_day: str, to_day: str) -> Iterator[bytes]:
+    # One row group (Parquet) or record batch (Arrow IPC) per EXPORT_ROW_GROUP_SIZE rows
+    schema = arrow_schema(columns(dataset))
+    sink = ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema) if fmt == "parquet" else pyarrow.ipc.new_stream(sink, schema)
+    try:
+        for rows in iter_rows(dataset, from_day, to_day, EXPORT_ROW_GROUP_SIZE):
+            writer.write_batch(record_batch(rows, schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+# GET a dataset's rows between 2 days, inclusive, as chunks of an export file
+def iter_export(dataset: str, fmt: str, from_day: str, to_day: str) -> Iterator[bytes]:
+    """Yield the encoded export piece by piece. Parquet and Arrow need pyarrow (see arrow_available)."""
+    logger.info(f"Exporting {dataset} from {from_day} to {to_day} as {fmt}")
+    if fmt == "csv":
+        return iter_csv(dataset, from_day, to_day)
+    return iter_arrow(dataset, fmt, from_day, to_day)
@@ -0,0 +1,137 @@
+from collections import OrderedDict
+from sqlite3 import Error
+from pydantic import BaseModel
+from pydantic_core import to_json
+from service.database import write_transaction
+import hashlib
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# A client that retries a POST sends the same Idempotency-Key header. The first request
+# reserves the key, runs the write and stores its response, all in one transaction; repeats
+# get that response back instead of writing again. Keys live in idempotency_keys for
+# IDEMPOTENCY_TTL seconds, and completed ones are also kept in an in-memory LRU so a retry
+# usually costs a dict lookup.
+IDEMPOTENCY_TTL = int(os.getenv('IDEMPOTENCY_TTL', str(24 * 3600)))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv('IDEMPOTENCY_CACHE_SIZE', '1024'))
+MAX_KEY_LENGTH = 255
+PURGE_INTERVAL = 600
+
+class StoredResponse(BaseModel):
+    fingerprint: str
+    status_code: int
+    body: str = ""
+    created_at: int
+
+class IdempotencyError(Exception):
+    status_code = 400
+
+class KeyReused(IdempotencyError):
+    status_code = 422
+
+completed: OrderedDict[str, StoredResponse] = OrderedDict()
+lock = threading.Lock()
+last_purge = 0.0
+
+def validate_key(key: str) -> str:
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise IdempotencyError(f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")
+    return key
+
+def fingerprint(endpoint: str, payload) -> str:
+    return hashlib.sha256(endpoint.encode() + b"\0" + to_json(payload)).hexdigest()
+
+def remember(key: str, stored: StoredResponse):
+    with lock:
+        completed[key] = stored
+        completed.move_to_end(key)
+        while len(completed) > IDEMPOTENCY_CACHE_SIZE:
+            completed.popitem(last=False)
+
+def cached(key: str, now: int) -> StoredResponse | None:
+    with lock:
+        stored = completed.get(key)
+        if stored is None:
+            return None
+        if stored.created_at + IDEMPOTENCY_TTL <= now:
+            del completed[key]
+            return None
+        completed.move_to_end(key)
+        return stored
+
+def replay(key: str, stored: StoredResponse, digest: str) -> StoredResponse:
+    if stored.fingerprint != digest:
+        raise KeyReused(f"Idempotency-Key {key!r} was already used for a different request")
+    return stored
+
+def lookup(key: str, endpoint: str, payload) -> StoredResponse | None:
+    """Return the response to replay from the in-memory LRU, if any. Cheap enough for the event loop."""
+    validate_key(key)
+    stored = cached(key, int(time.time()))
+    return None if stored is None else replay(key, stored, fingerprint(endpoint, payload))
+
+def purge_expired(cursor, now: int):
+    global last_purge
+    if time.monotonic() - last_purge < PURGE_INTERVAL:
+        return
+    last_purge = time.monotonic()
+    cursor.execute("DELETE FROM idempotency_keys WHERE created_at <= ?", (now - IDEMPOTENCY_TTL,))
+    if cursor.rowcount:
+        logger.info(f"Expired {cursor.rowcount} idempotency keys")
+
+def reserve(cursor, key: str, digest: str, now: int) -> StoredResponse | None:
+    """Claim key for this request, or return what is already stored under it."""
+    # A reservation is only ever committed together with its response, so a row without one
+    # was left by a write that never finished: it is claimed again, like an expired key
+    cursor.execute("""
+        INSERT INTO idempotency_keys(idem_key, fingerprint, status_code, body, created_at) VALUES(?, ?, NULL, '', ?)
+        ON CONFLICT(idem_key) DO UPDATE SET fingerprint = excluded.fingerprint, status_code = NULL, body = '', created_at = excluded.created_at
+        WHERE idempotency_keys.created_at <= ? OR idempotency_keys.status_code IS NULL
+        """, (key, digest, now, now - IDEMPOTENCY_TTL))
+    if cursor.rowcount == 1:
+        return None
+    row = cursor.execute("SELECT fingerprint, status_code, body, created_at FROM idempotency_keys WHERE idem_key = ?", (key,)).fetchone()
+    return StoredResponse(fingerprint=row[0], status_code=row[1], body=row[2], created_at=row[3])
+
+# Run func(*args) at most once per key. Must run on the writer thread (executor.write), which
+# serializes it against every other write of this process; BEGIN IMMEDIATE and the table's
+# primary key settle races between worker processes.
+def run_once(key: str, endpoint: str, payload, status_code: int, succeeded, func, *args):
+    """Return (result, None) after running func, or (None, stored) when replaying a response.
+
+    The reservation, func's write and the stored response commit in one transaction, so a
+    crash in between leaves nothing behind and the client's retry simply runs again. A result
+    for which succeeded(result) is false is returned as is but not stored: func rolled back,
+    and the reservation with it.
+    """
+    validate_key(key)
+    now = int(time.time())
+    digest = fingerprint(endpoint, payload)
+
+    stored = cached(key, now)
+    if stored is not None:
+        return None, replay(key, stored, digest)
+
+    try:
+        with write_transaction() as conn:
+            cursor = conn.cursor()
+            purge_expired(cursor, now)
+            stored = reserve(cursor, key, digest, now)
+            if stored is not None:
+                return None, replay(key, stored, digest)
+
+            result = func(*args)
+            if not succeeded(result):
+                return result, None
+            stored = StoredResponse(fingerprint=digest, status_code=status_code, body=to_json(result).decode(), created_at=now)
+            cursor.execute("UPDATE idempotency_keys SET status_code = ?, body = ? WHERE idem_key = ?", (stored.status_code, stored.body, key))
+    except Error as e:
+        logger.error(f"Database error running write for idempotency key {key!r}: {e}")
+        raise
+
+    remember(key, stored)
+    return result, None
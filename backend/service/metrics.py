@@ -0,0 +1,124 @@
+import bisect
+import logging
+import os
+import re
+import threading
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        for label_values, (counts, total, count) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                bucket_labels = format_labels(self.labels, label_values, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            bucket_labels = format_labels(self.labels, label_values, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{bucket_labels} {count}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, label_values)} {total}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, label_values)} {count}")
+        return lines
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = dict(self._values)
+        for label_values, value in sorted(snapshot.items()):
+            lines.append(f"{self.name}{format_labels(self.labels, label_values)} {value}")
+        return lines
+
+class Gauge:
+    """A gauge whose samples are collected from a callback at scrape time."""
+    def __init__(self, name: str, help: str, labels: tuple, collect: Callable[[], dict[tuple, float]]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.collect = collect
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for label_values, value in sorted(self.collect().items()):
+            lines.append(f"{self.name}{format_labels(self.labels, label_values)} {value}")
+        return lines
+
+request_latency = Histogram("nails_http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status"))
+pool_wait = Histogram("nails_db_pool_wait_seconds", "Time spent waiting to check out a pooled connection", ("pool",))
+pool_timeouts = Counter("nails_db_pool_timeouts_total", "Connection checkouts that timed out", ("pool",))
+query_latency = Histogram("nails_db_query_duration_seconds", "SQL execution time (execute plus fetch) by statement", ("statement",))
+group_commit_size = Histogram("nails_db_group_commit_size", "Writes committed together by the group-commit writer",
+                              buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+backup_duration = Histogram("nails_db_backup_duration_seconds", "Online backup duration, snapshot to finished file", ("trigger",),
+                            buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600))
+gauges: list[Gauge] = []
+
+def register_gauge(name: str, help: str, labels: tuple, collect: Callable[[], dict[tuple, float]]):
+    gauges.append(Gauge(name, help, labels, collect))
+
+# Log any statement slower than this many milliseconds (0 disables the slow-query log)
+slow_query_ms = float(os.getenv('DB_SLOW_QUERY_MS', '0'))
+
+_whitespace = re.compile(r"\s+")
+_placeholder_list = re.compile(r"\?\d*(\s*,\s*\?\d*)+")
+
+def normalize_statement(sql: str) -> str:
+    # Expanded IN (?, ?, ...) lists would otherwise create one series per list length
+    return _placeholder_list.sub("?, ...", _whitespace.sub(" ", sql).strip())[:200]
+
+def observe_query(sql: str, seconds: float):
+    statement = normalize_statement(sql)
+    query_latency.observe(seconds, statement)
+    if slow_query_ms and seconds * 1000 >= slow_query_ms:
+        logger.warning(f"Slow query ({seconds * 1000:.1f} ms): {statement}")
+
+def render() -> str:
+    lines = []
+    for metric in (request_latency, pool_wait, pool_timeouts, query_latency, group_commit_size, backup_duration, *gauges):
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
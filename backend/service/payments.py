@@ -1,6 +1,8 @@
 from sqlite3 import Error
 from typing import Any
-from service.database import pool
+from service.database import read_pool, write_pool, iter_batches, chunked, placeholders
+from service import archive, events
+from functools import partial
 from pydantic import BaseModel, field_validator
 import logging
 
@@ -19,6 +21,9 @@ class Payments(BaseModel):
             raise ValueError('Payment amount cannot be negative')
         return v
 
+class PmtIdsRequest(BaseModel):
+    pmt_ids: list[int] = []
+
 def getDefaultPayment() -> Payments:
     return Payments(pmt_id=-1, work_id=0, pmt_amount=0, pmt_type="")
 
@@ -26,48 +31,59 @@ def getDefaultPayment() -> Payments:
 def row_to_payment(row: list[Any]):
     return Payments(pmt_id=row[0], work_id=row[1], pmt_amount=row[2], pmt_type=row[3])
 
-def list_to_payments(rows: list[Any]):
-    return [row_to_payment(row) for row in rows]
+PAYMENTS_COLUMNS = ("pmt_id", "work_id", "pmt_amount", "pmt_type")
+
+# Fast read path for lists: rows were validated on their way into the database, so
+# decode them straight to dicts instead of building and validating a model per row
+def list_to_payments(rows: list[Any]) -> list[dict[str, Any]]:
+    return [dict(zip(PAYMENTS_COLUMNS, row)) for row in rows]
 
-# GET all payments
-def select_all_payments() -> list[Payments]:
-    with pool.connection() as conn:
+# GET all payments, keyset-paginated on pmt_id (limit=None returns everything after after_id)
+def select_all_payments(after_id: int = 0, limit: int | None = None) -> list[dict[str, Any]]:
+    with read_pool.connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM payments")
+        cursor.execute(*archive.routed_query(conn, "payments", "pmt_id > ?", (after_id,), order_by="pmt_id", limit=limit or -1, key="pmt", after_id=after_id))
         output = cursor.fetchall()
-
+    
     return list_to_payments(output)
 
+# Stream all payments in batches of row dicts, for NDJSON responses
+def iter_all_payments(after_id: int = 0, limit: int | None = None):
+    for rows in iter_batches(partial(archive.routed_query, table="payments", where="pmt_id > ?", params=(after_id,), order_by="pmt_id", limit=limit or -1, key="pmt", after_id=after_id)):
+        yield list_to_payments(rows)
+
 # GET payment by ID
 def select_payment_id(pmt_id: int) -> Payments:
-    with pool.connection() as conn:
+    with read_pool.connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM payments WHERE pmt_id = ?", (pmt_id,))
+        cursor.execute(*archive.routed_query(conn, "payments", "pmt_id = ?", (pmt_id,), key="pmt", ids=[pmt_id]))
         output = cursor.fetchone()
 
     return row_to_payment(output) if output else getDefaultPayment()
 
-# GET payments by list of pmt_ids(s):
-def select_payment_pmtids(pmt_ids: str) -> list[Payments]:
-    with pool.connection() as conn:
+# GET payments by list of pmt_ids(s), one query per chunk of ids:
+def select_payment_pmtids(pmt_ids: list[int]) -> list[dict[str, Any]]:
+    output = []
+    with read_pool.connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM payments WHERE pmt_id IN (?)", (pmt_ids.replace('-', ','),))
-        output = cursor.fetchall()
+        for chunk in chunked(pmt_ids):
+            cursor.execute(*archive.routed_query(conn, "payments", f"pmt_id IN ({placeholders(len(chunk))})", chunk, key="pmt", ids=chunk))
+            output.extend(cursor.fetchall())
     
     return list_to_payments(output)
 
 # POST / create new payment
 def create_new_payment(new_payment: Payments) -> Payments:
-    with pool.connection() as conn:
+    with write_pool.connection() as conn:
         cursor = conn.cursor()
 
         try:
             cursor.execute("INSERT INTO payments(work_id, pmt_amount, pmt_type) VALUES(?, ?, ?)",
                         (new_payment.work_id, new_payment.pmt_amount, new_payment.pmt_type))
-            cursor.execute("SELECT pmt_id FROM payments ORDER BY pmt_id DESC LIMIT 1")
-            new_payment.pmt_id = cursor.fetchone()[0]
+            new_payment.pmt_id = cursor.lastrowid
             conn.commit()
             logger.info(f"Payment created: {new_payment.pmt_id} - ${new_payment.pmt_amount}")
+            events.publish("payments", "created", new_payment)
         except Error as e:
             logger.error(f"Database error creating payment: {e}")
             conn.rollback()
@@ -77,41 +93,41 @@ def create_new_payment(new_payment: Payments) -> Payments:
 
 # PUT / update existing payment
 def update_existing_payment(exist_pmt: Payments) -> Payments:
-    with pool.connection() as conn:
+    with write_pool.connection() as conn:
         cursor = conn.cursor()
 
         try:
-            found_detail = select_payment_id(exist_pmt.pmt_id)
-            if found_detail.pmt_id != -1:
-                cursor.execute("UPDATE payments SET work_id=?, pmt_amount=?, pmt_type=? WHERE pmt_id=?",
-                            (exist_pmt.work_id, exist_pmt.pmt_amount, exist_pmt.pmt_type, exist_pmt.pmt_id))
-                conn.commit()
-                logger.info(f"Payment updated: {exist_pmt.pmt_id}")
-            else:
+            cursor.execute("UPDATE payments SET work_id=?, pmt_amount=?, pmt_type=? WHERE pmt_id=? RETURNING *",
+                        (exist_pmt.work_id, exist_pmt.pmt_amount, exist_pmt.pmt_type, exist_pmt.pmt_id))
+            updated = cursor.fetchone()
+            if updated is None:
                 raise Error(f"pmt_id={exist_pmt.pmt_id} cannot be found in table:payments")
+            conn.commit()
+            logger.info(f"Payment updated: {exist_pmt.pmt_id}")
+            events.publish("payments", "updated", row_to_payment(updated))
         except Error as e:
             logger.error(f"Database error updating payment {exist_pmt.pmt_id}: {e}")
             conn.rollback()
             return getDefaultPayment()
     
-    return exist_pmt
+    return row_to_payment(updated)
 
 # DELETE existing payment by ID
 def delete_existing_payment(exist_pmt_id: int) -> Payments:
-    with pool.connection() as conn:
+    with write_pool.connection() as conn:
         cursor = conn.cursor()
 
         try:
-            found_detail = select_payment_id(exist_pmt_id)
-            if found_detail.pmt_id != -1:
-                cursor.execute("DELETE FROM payments WHERE pmt_id=?", (exist_pmt_id,))
-                conn.commit()
-                logger.info(f"Payment deleted: {exist_pmt_id}")
-            else:
+            cursor.execute("DELETE FROM payments WHERE pmt_id=? RETURNING *", (exist_pmt_id,))
+            deleted = cursor.fetchone()
+            if deleted is None:
                 raise Error(f"pmt_id={exist_pmt_id} cannot be found in table:payments")
+            conn.commit()
+            logger.info(f"Payment deleted: {exist_pmt_id}")
+            events.publish("payments", "deleted", row_to_payment(deleted))
         except Error as e:
             logger.error(f"Database error deleting payment {exist_pmt_id}: {e}")
             conn.rollback()
             return getDefaultPayment()
     
-    return found_detail
+    return row_to_payment(deleted)
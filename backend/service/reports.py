@@ -0,0 +1,98 @@
+from datetime import date
+from service.database import read_pool
+from pydantic import BaseModel
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Reports read the per-day rollup tables maintained by triggers (see database.MIGRATIONS),
+# so a month of payroll touches a few hundred rows instead of every emp_work_detail row.
+class DailyTotal(BaseModel):
+    day: str
+    works_count: int = 0
+    work_amount: float = 0
+    work_tip: float = 0
+    work_discount: float = 0
+    work_grandtotal: float = 0
+
+class EmployeeDailyTotal(BaseModel):
+    day: str
+    emp_id: int
+    details_count: int = 0
+    emp_amount: float = 0
+    emp_tip: float = 0
+
+class PaymentDailyTotal(BaseModel):
+    day: str
+    pmt_type: str
+    payments_count: int = 0
+    pmt_amount: float = 0
+
+class PayrollLine(BaseModel):
+    emp_id: int
+    emp_name: str = ""
+    details_count: int = 0
+    emp_amount: float = 0
+    emp_tip: float = 0
+    emp_work_percentage: int = 0
+    emp_cash_percentage: int = 0
+    emp_salary: int = 0
+    commission: float = 0
+    cash_pay: float = 0
+    check_pay: float = 0
+
+def validate_day_range(from_day: str, to_day: str) -> tuple[str, str]:
+    # Raises ValueError unless both ends are YYYY-MM-DD
+    return date.fromisoformat(from_day).isoformat(), date.fromisoformat(to_day).isoformat()
+
+# GET revenue per day
+def select_daily_totals(from_day: str, to_day: str) -> list[DailyTotal]:
+    with read_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT day, works_count, work_amount, work_tip, work_discount, work_grandtotal FROM daily_totals WHERE day BETWEEN ? AND ? AND works_count > 0 ORDER BY day",
+                    (from_day, to_day))
+        output = cursor.fetchall()
+
+    return [DailyTotal(day=row[0], works_count=row[1], work_amount=row[2], work_tip=row[3], work_discount=row[4], work_grandtotal=row[5]) for row in output]
+
+# GET amounts and tips per technician per day
+def select_employee_totals(from_day: str, to_day: str) -> list[EmployeeDailyTotal]:
+    with read_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT day, emp_id, details_count, emp_amount, emp_tip FROM daily_employee_totals WHERE day BETWEEN ? AND ? AND details_count > 0 ORDER BY day, emp_id",
+                    (from_day, to_day))
+        output = cursor.fetchall()
+
+    return [EmployeeDailyTotal(day=row[0], emp_id=row[1], details_count=row[2], emp_amount=row[3], emp_tip=row[4]) for row in output]
+
+# GET payments per type per day
+def select_payment_totals(from_day: str, to_day: str) -> list[PaymentDailyTotal]:
+    with read_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT day, pmt_type, payments_count, pmt_amount FROM daily_payment_totals WHERE day BETWEEN ? AND ? AND payments_count > 0 ORDER BY day, pmt_type",
+                    (from_day, to_day))
+        output = cursor.fetchall()
+
+    return [PaymentDailyTotal(day=row[0], pmt_type=row[1], payments_count=row[2], pmt_amount=row[3]) for row in output]
+
+# GET commission payroll for a period.
+# commission = emp_amount * emp_work_percentage%, of which emp_cash_percentage% is paid in cash
+# and the rest by check; tips are reported separately.
+def select_payroll(from_day: str, to_day: str) -> list[PayrollLine]:
+    with read_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""SELECT t.emp_id, COALESCE(e.emp_name, ''), SUM(t.details_count), TOTAL(t.emp_amount), TOTAL(t.emp_tip),
+                              COALESCE(e.emp_work_percentage, 0), COALESCE(e.emp_cash_percentage, 0), COALESCE(e.emp_salary, 0)
+                          FROM daily_employee_totals t LEFT JOIN employees e ON e.emp_id = t.emp_id
+                          WHERE t.day BETWEEN ? AND ?
+                          GROUP BY t.emp_id HAVING SUM(t.details_count) > 0 ORDER BY t.emp_id""", (from_day, to_day))
+        output = cursor.fetchall()
+
+    lines = []
+    for row in output:
+        commission = round(row[3] * row[5] / 100, 2)
+        cash_pay = round(commission * row[6] / 100, 2)
+        lines.append(PayrollLine(emp_id=row[0], emp_name=row[1], details_count=row[2], emp_amount=round(row[3], 2), emp_tip=round(row[4], 2),
+                                 emp_work_percentage=row[5], emp_cash_percentage=row[6], emp_salary=row[7],
+                                 commission=commission, cash_pay=cash_pay, check_pay=round(commission - cash_pay, 2)))
+    return lines
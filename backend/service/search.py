@@ -0,0 +1,109 @@
+from typing import Any
+from pydantic import BaseModel
+from service.database import read_pool
+from service.datetimes import WORK_TS, epoch_range
+from service.works import Works, WORKS_COLUMNS
+from service.emp_work_detail import Detail, DETAIL_COLUMNS
+import re
+
+# Full-text search over the FTS5 indexes of migration 8. Only the main database is indexed:
+# works moved to an archive file (see service.archive) drop out of search results.
+
+# Marks around matched terms in snippets
+SNIPPET_OPEN, SNIPPET_CLOSE = "[", "]"
+# Shortest fragment the employees' trigram index can match
+MIN_TRIGRAM = 3
+
+class WorkHit(Works):
+    rank: float
+    snippet: str
+
+class DetailHit(Detail):
+    work_datetime: str
+    rank: float
+    snippet: str
+
+# No SSN or pay settings in search results, just enough to pick the right person
+class EmployeeHit(BaseModel):
+    emp_id: int
+    emp_name: str
+    emp_phone: str
+    rank: float
+
+_word = re.compile(r"\w+")
+
+def words(q: str) -> list[str]:
+    return _word.findall(q)
+
+def match_prefixes(q: str) -> str:
+    """Turn free text into an FTS5 query: every word must appear, as a word or word prefix.
+
+    Each word is quoted, so FTS5 operators typed by the user are matched literally.
+    """
+    terms = words(q)
+    if not terms:
+        raise ValueError("Search text must contain at least one letter or digit")
+    return " ".join(f'"{term}"*' for term in terms)
+
+def date_filter(from_datetime: str | None, to_datetime: str | None) -> tuple[str, tuple]:
+    if from_datetime is None and to_datetime is None:
+        return "", ()
+    start, end = epoch_range(from_datetime or "1970-01-01", to_datetime or "9999-12-31")
+    return f" AND {WORK_TS} BETWEEN ? AND ?", (start, end)
+
+# GET works whose notes match q, best match first, optionally within a date range
+def search_works(q: str, from_datetime: str | None = None, to_datetime: str | None = None, limit: int = 50) -> list[dict[str, Any]]:
+    where, params = date_filter(from_datetime, to_datetime)
+    with read_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT w.*, bm25(works_fts) AS rank, snippet(works_fts, 0, ?, ?, '…', 12)
+            FROM works_fts JOIN works w ON w.work_id = works_fts.rowid
+            WHERE works_fts MATCH ?{where}
+            ORDER BY rank LIMIT ?
+            """, (SNIPPET_OPEN, SNIPPET_CLOSE, match_prefixes(q), *params, limit))
+        output = cursor.fetchall()
+
+    width = len(WORKS_COLUMNS)
+    return [{**dict(zip(WORKS_COLUMNS, row[:width])), "rank": row[width], "snippet": row[width + 1]} for row in output]
+
+# GET work details whose notes match q, with their work's date so results can be shown in time
+def search_details(q: str, from_datetime: str | None = None, to_datetime: str | None = None, limit: int = 50) -> list[dict[str, Any]]:
+    where, params = date_filter(from_datetime, to_datetime)
+    with read_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT d.*, w.work_datetime, bm25(details_fts) AS rank, snippet(details_fts, 0, ?, ?, '…', 12)
+            FROM details_fts
+            JOIN emp_work_detail d ON d.detail_id = details_fts.rowid
+            JOIN works w ON w.work_id = d.work_id
+            WHERE details_fts MATCH ?{where}
+            ORDER BY rank LIMIT ?
+            """, (SNIPPET_OPEN, SNIPPET_CLOSE, match_prefixes(q), *params, limit))
+        output = cursor.fetchall()
+
+    width = len(DETAIL_COLUMNS)
+    return [{**dict(zip(DETAIL_COLUMNS, row[:width])), "work_datetime": row[width], "rank": row[width + 1], "snippet": row[width + 2]} for row in output]
+
+# GET employees whose name or phone contains every word of q
+def search_employees(q: str, limit: int = 20) -> list[dict[str, Any]]:
+    terms = words(q)
+    if not terms:
+        raise ValueError("Search text must contain at least one letter or digit")
+    with read_pool.connection() as conn:
+        cursor = conn.cursor()
+        if min(len(term) for term in terms) >= MIN_TRIGRAM:
+            cursor.execute("""
+                SELECT e.emp_id, e.emp_name, e.emp_phone, bm25(employees_fts) AS rank
+                FROM employees_fts JOIN employees e ON e.emp_id = employees_fts.rowid
+                WHERE employees_fts MATCH ?
+                ORDER BY rank LIMIT ?
+                """, (" ".join(f'"{term}"' for term in terms), limit))
+        else:
+            # Too short for trigrams: the roster is small enough to scan for name/phone prefixes
+            like = " AND ".join("(e.emp_name LIKE ? OR e.emp_name LIKE ? OR e.emp_phone LIKE ?)" for _ in terms)
+            params = [p for term in terms for p in (f"{term}%", f"% {term}%", f"{term}%")]
+            cursor.execute(f"SELECT e.emp_id, e.emp_name, e.emp_phone, 0.0 FROM employees e WHERE {like} ORDER BY e.emp_name LIMIT ?", (*params, limit))
+        output = cursor.fetchall()
+
+    return [{"emp_id": row[0], "emp_name": row[1], "emp_phone": row[2], "rank": row[3]} for row in output]
@@ -0,0 +1,136 @@
+from sqlite3 import Error
+from typing import Any
+from service.database import read_pool, write_pool
+from service.datetimes import WORK_TS, epoch_day, epoch_range
+from service.works import Works, WORKS_COLUMNS
+from service.emp_work_detail import Detail
+from service.payments import Payments
+from service import archive, events
+from pydantic import BaseModel
+import logging
+
+logger = logging.getLogger(__name__)
+
+# One checkout: the work plus every technician's detail and every payment taken for it
+class Ticket(BaseModel):
+    work: Works
+    details: list[Detail] = []
+    payments: list[Payments] = []
+
+# Read side: a detail carries the technician's name so a ticket renders without more calls
+class TicketDetail(Detail):
+    emp_name: str = ""
+
+class TicketView(BaseModel):
+    work: Works
+    details: list[TicketDetail] = []
+    payments: list[Payments] = []
+
+# Works LEFT JOIN their details and technicians; payments come from a second query because
+# joining both children at once would multiply rows (details x payments per work)
+TICKET_ROWS = """
+    SELECT w.*, d.detail_id, d.emp_id, d.emp_amount, d.emp_tip, d.detail_notes, e.emp_name
+    FROM {schema}.works w
+    LEFT JOIN {schema}.emp_work_detail d ON d.work_id = w.work_id
+    LEFT JOIN main.employees e ON e.emp_id = d.emp_id
+    WHERE """
+TICKET_PAYMENTS = """
+    SELECT p.* FROM {schema}.payments p JOIN {schema}.works w ON w.work_id = p.work_id
+    WHERE """
+
+def select_ticket_views(conn, where: str, params: tuple, **filters) -> list[dict[str, Any]]:
+    """Fetch works matching `where` (on alias w) as nested ticket dicts, in work_id order."""
+    parts = archive.route(conn, **filters)
+    cursor = conn.cursor()
+    # Trusted rows, decoded straight to dicts like the list endpoints (see works.list_to_works)
+    tickets: dict[int, dict[str, Any]] = {}
+    width = len(WORKS_COLUMNS)
+    cursor.execute(*archive.union_query(TICKET_ROWS + where, params, parts, order_by=f"1, {width + 1}"))
+    for row in cursor.fetchall():
+        ticket = tickets.get(row[0])
+        if ticket is None:
+            ticket = tickets[row[0]] = {"work": dict(zip(WORKS_COLUMNS, row[:width])), "details": [], "payments": []}
+        detail_id, emp_id, emp_amount, emp_tip, detail_notes, emp_name = row[width:]
+        if detail_id is not None:
+            ticket["details"].append({"detail_id": detail_id, "work_id": row[0], "emp_id": emp_id, "emp_amount": emp_amount,
+                                      "emp_tip": emp_tip, "detail_notes": detail_notes, "emp_name": emp_name or ""})
+
+    if tickets:
+        cursor.execute(*archive.union_query(TICKET_PAYMENTS + where, params, parts, order_by="1"))
+        for pmt_id, work_id, pmt_amount, pmt_type in cursor.fetchall():
+            tickets[work_id]["payments"].append({"pmt_id": pmt_id, "work_id": work_id, "pmt_amount": pmt_amount, "pmt_type": pmt_type})
+    return list(tickets.values())
+
+# GET one ticket: the work, its details with technician names, and its payments
+def select_ticket_id(work_id: int) -> dict[str, Any] | None:
+    with read_pool.connection() as conn:
+        found = select_ticket_views(conn, "w.work_id = ?", (work_id,), key="work", ids=[work_id])
+    return found[0] if found else None
+
+# GET every ticket between 2 dates, inclusive, for the day view (raises ValueError on an unreadable date)
+def select_tickets_between_dates(from_date: str, to_date: str) -> list[dict[str, Any]]:
+    start, end = epoch_range(from_date, to_date)
+    with read_pool.connection() as conn:
+        return select_ticket_views(conn, f"{WORK_TS} BETWEEN ? AND ?", (start, end),
+                                   from_day=epoch_day(start), to_day=epoch_day(end))
+
+def inserted_ids(cursor, table: str, count: int) -> list[int]:
+    # All writes go through the single writer connection, so the AUTOINCREMENT keys handed
+    # out by one executemany() inside our transaction are consecutive and end at seq.
+    last_id = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()[0]
+    return list(range(last_id - count + 1, last_id + 1))
+
+# POST / create many tickets in a single transaction (one commit, one fsync)
+def create_new_tickets(tickets: list[Ticket]) -> list[Ticket]:
+    if not tickets:
+        return []
+
+    with write_pool.connection() as conn:
+        cursor = conn.cursor()
+
+        try:
+            cursor.executemany("INSERT INTO works(work_datetime, work_amount, work_tip, work_discount, work_grandtotal, work_notes) VALUES(?, ?, ?, ?, ?, ?)",
+                            [(t.work.work_datetime, t.work.work_amount, t.work.work_tip, t.work.work_discount, t.work.work_grandtotal, t.work.work_notes) for t in tickets])
+            for ticket, work_id in zip(tickets, inserted_ids(cursor, "works", len(tickets))):
+                ticket.work.work_id = work_id
+                for detail in ticket.details:
+                    detail.work_id = work_id
+                for payment in ticket.payments:
+                    payment.work_id = work_id
+
+            details = [detail for t in tickets for detail in t.details]
+            if details:
+                cursor.executemany("INSERT INTO emp_work_detail(work_id, emp_id, emp_amount, emp_tip, detail_notes) VALUES(?, ?, ?, ?, ?)",
+                                [(d.work_id, d.emp_id, d.emp_amount, d.emp_tip, d.detail_notes) for d in details])
+                for detail, detail_id in zip(details, inserted_ids(cursor, "emp_work_detail", len(details))):
+                    detail.detail_id = detail_id
+
+            pmts = [payment for t in tickets for payment in t.payments]
+            if pmts:
+                cursor.executemany("INSERT INTO payments(work_id, pmt_amount, pmt_type) VALUES(?, ?, ?)",
+                                [(p.work_id, p.pmt_amount, p.pmt_type) for p in pmts])
+                for payment, pmt_id in zip(pmts, inserted_ids(cursor, "payments", len(pmts))):
+                    payment.pmt_id = pmt_id
+
+            conn.commit()
+            logger.info(f"Tickets created: {len(tickets)} works, {len(details)} details, {len(pmts)} payments")
+            # Per-table events too, so subscribers of works/details/payments see checkouts
+            # exactly as if each row had been created through its own endpoint
+            for ticket in tickets:
+                events.publish("works", "created", ticket.work)
+                for detail in ticket.details:
+                    events.publish("details", "created", detail)
+                for payment in ticket.payments:
+                    events.publish("payments", "created", payment)
+                events.publish("tickets", "created", ticket)
+        except Error as e:
+            logger.error(f"Database error creating tickets: {e}")
+            conn.rollback()
+            return []
+
+    return tickets
+
+# POST / create a single ticket
+def create_new_ticket(new_ticket: Ticket) -> Ticket | None:
+    created = create_new_tickets([new_ticket])
+    return created[0] if created else None
@@ -1,4 +1,7 @@
-from service.database import pool
+from service.database import read_pool, write_pool, iter_batches
+from service import archive, events
+from service.datetimes import WORK_TS, epoch_day, epoch_range, normalize_datetime
+from functools import partial
 from typing import Any
 from sqlite3 import Error
 from pydantic import BaseModel, field_validator
@@ -14,6 +17,12 @@ class Works(BaseModel):
     work_discount: float = 0
     work_grandtotal: float = 0
     work_notes: str = ""
+
+    @field_validator('work_datetime')
+    @classmethod
+    def validate_datetime(cls, v):
+        # Stored as canonical ISO-8601 in the shop's local time, see service.datetimes
+        return normalize_datetime(v) if v else v
     
     @field_validator('work_amount', 'work_tip', 'work_discount', 'work_grandtotal')
     @classmethod
@@ -27,34 +36,46 @@ def getDefaultWorks() -> Works:
 
 # Implement all 4 CRUD operations on works table
 def row_to_works(row: list[Any]):
-    return Works(work_id=row[0], work_datetime=row[1], work_amount=row[2], work_tip=row[3], work_discount=row[4], work_grandtotal=row[5], work_notes=row[6])
+    # Rows were validated on their way in; re-validating would fail on the legacy work_datetime
+    # values migration 5 could not parse and left as they were
+    return Works.model_construct(work_id=row[0], work_datetime=row[1], work_amount=row[2], work_tip=row[3], work_discount=row[4], work_grandtotal=row[5], work_notes=row[6])
+
+WORKS_COLUMNS = ("work_id", "work_datetime", "work_amount", "work_tip", "work_discount", "work_grandtotal", "work_notes")
 
-def list_to_works(rows: list[Any]):
-    return [row_to_works(row) for row in rows]
+# Fast read path for lists: rows were validated on their way into the database, so
+# decode them straight to dicts instead of building and validating a model per row
+def list_to_works(rows: list[Any]) -> list[dict[str, Any]]:
+    return [dict(zip(WORKS_COLUMNS, row)) for row in rows]
 
-# GET all works
-def select_all_works() -> list[Works]:
-    with pool.connection() as conn:
+# GET all works, keyset-paginated on work_id (limit=None returns everything after after_id)
+def select_all_works(after_id: int = 0, limit: int | None = None) -> list[dict[str, Any]]:
+    with read_pool.connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM works")
+        cursor.execute(*archive.routed_query(conn, "works", "work_id > ?", (after_id,), order_by="work_id", limit=limit or -1, key="work", after_id=after_id))
         output = cursor.fetchall()
     
     return list_to_works(output)
 
+# Stream all works in batches of row dicts, for NDJSON responses
+def iter_all_works(after_id: int = 0, limit: int | None = None):
+    for rows in iter_batches(partial(archive.routed_query, table="works", where="work_id > ?", params=(after_id,), order_by="work_id", limit=limit or -1, key="work", after_id=after_id)):
+        yield list_to_works(rows)
+
 # GET work by ID
 def select_work_id(id: int) -> Works:
-    with pool.connection() as conn:
+    with read_pool.connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM works WHERE work_id = ?", (id,))
+        cursor.execute(*archive.routed_query(conn, "works", "work_id = ?", (id,), key="work", ids=[id]))
         output = cursor.fetchone()
 
     return row_to_works(output) if output else getDefaultWorks()
 
-# GET works between any 2 dates:
-def select_works_between_dates(from_date: str, to_date: str) -> list[Works]:
-    with pool.connection() as conn:
+# GET works between any 2 dates, inclusive (raises ValueError on an unreadable date):
+def select_works_between_dates(from_date: str, to_date: str) -> list[dict[str, Any]]:
+    start, end = epoch_range(from_date, to_date)
+    with read_pool.connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM works WHERE work_datetime BETWEEN ? AND ?", (from_date, to_date))
+        cursor.execute(*archive.routed_query(conn, "works", f"{WORK_TS} BETWEEN ? AND ?", (start, end), from_day=epoch_day(start), to_day=epoch_day(end)))
         output = cursor.fetchall()
 
     return list_to_works(output)
@@ -62,16 +83,16 @@ def select_works_between_dates(from_date: str, to_date: str) -> list[Works]:
 
 # POST / create new works
 def create_new_work(new_work: Works) -> Works:
-    with pool.connection() as conn:
+    with write_pool.connection() as conn:
         cursor = conn.cursor()
 
         try:
             cursor.execute("INSERT INTO works(work_datetime, work_amount, work_tip, work_discount, work_grandtotal, work_notes) VALUES(?, ?, ?, ?, ?, ?)",
                         (new_work.work_datetime, new_work.work_amount, new_work.work_tip, new_work.work_discount, new_work.work_grandtotal, new_work.work_notes))
-            cursor.execute("SELECT work_id FROM works ORDER BY work_id DESC LIMIT 1")
-            new_work.work_id = cursor.fetchone()[0]
+            new_work.work_id = cursor.lastrowid
             conn.commit()
             logger.info(f"Work created: {new_work.work_id} on {new_work.work_datetime}")
+            events.publish("works", "created", new_work)
         except Error as e:
             logger.error(f"Database error creating work: {e}")
             conn.rollback()
@@ -81,42 +102,42 @@ def create_new_work(new_work: Works) -> Works:
 
 # PUT / update existing work
 def update_existing_work(exist_work: Works) -> Works:
-    with pool.connection() as conn:
+    with write_pool.connection() as conn:
         cursor = conn.cursor()
 
         try:
-            found_work = select_work_id(exist_work.work_id)
-            if found_work.work_id != -1:
-                cursor.execute("UPDATE works SET work_datetime=?, work_amount=?, work_tip=?, work_discount=?, work_grandtotal=?, work_notes=? WHERE work_id=?",
-                            (exist_work.work_datetime, exist_work.work_amount, exist_work.work_tip, exist_work.work_discount, exist_work.work_grandtotal, exist_work.work_notes, exist_work.work_id))
-                conn.commit()
-                logger.info(f"Work updated: {exist_work.work_id}")
-            else:
-                raise Error(f"work_id={found_work.work_id} cannot be found in table:works")
+            cursor.execute("UPDATE works SET work_datetime=?, work_amount=?, work_tip=?, work_discount=?, work_grandtotal=?, work_notes=? WHERE work_id=? RETURNING *",
+                        (exist_work.work_datetime, exist_work.work_amount, exist_work.work_tip, exist_work.work_discount, exist_work.work_grandtotal, exist_work.work_notes, exist_work.work_id))
+            updated = cursor.fetchone()
+            if updated is None:
+                raise Error(f"work_id={exist_work.work_id} cannot be found in table:works")
+            conn.commit()
+            logger.info(f"Work updated: {exist_work.work_id}")
+            events.publish("works", "updated", row_to_works(updated))
         except Error as e:
             logger.error(f"Database error updating work {exist_work.work_id}: {e}")
             conn.rollback()
             return getDefaultWorks()
     
-    return exist_work
+    return row_to_works(updated)
 
 # DELETE existing work by ID
 def delete_existing_work(exist_work_id: int) -> Works:
-    with pool.connection() as conn:
+    with write_pool.connection() as conn:
         cursor = conn.cursor()
 
         try:
-            found_work = select_work_id(exist_work_id)
-            if found_work.work_id != -1:
-                cursor.execute("DELETE FROM works WHERE work_id=?", (exist_work_id,))
-                conn.commit()
-                logger.info(f"Work deleted: {exist_work_id}")
-            else:
-                raise Error(f"work_id={found_work.work_id} cannot be found in table:works")
+            cursor.execute("DELETE FROM works WHERE work_id=? RETURNING *", (exist_work_id,))
+            deleted = cursor.fetchone()
+            if deleted is None:
+                raise Error(f"work_id={exist_work_id} cannot be found in table:works")
+            conn.commit()
+            logger.info(f"Work deleted: {exist_work_id}")
+            events.publish("works", "deleted", row_to_works(deleted))
         except Error as e:
             logger.error(f"Database error deleting work {exist_work_id}: {e}")
             conn.rollback()
             return getDefaultWorks()
     
-    return found_work
+    return row_to_works(deleted)
     
\ No newline at end of file
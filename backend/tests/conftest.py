@@ -0,0 +1,37 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND))
+
+# service.database reads its configuration at import time: point it at a scratch copy of
+# the shop database before any test imports the app
+scratch = Path(tempfile.mkdtemp(prefix="nails-tests-"))
+shutil.copy(BACKEND.parent / "natural_nails.db", scratch / "natural_nails.db")
+os.environ["DATABASE_PATH"] = str(scratch / "natural_nails.db")
+os.environ["BACKUP_DIR"] = str(scratch / "backups")
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    import main
+    with TestClient(main.app) as client:
+        yield client
+    shutil.rmtree(scratch, ignore_errors=True)
+
+@pytest.fixture(scope="session")
+def backup(client) -> dict:
+    """Run one manual backup and return its finished status."""
+    assert client.post("/backups").status_code == 202
+    deadline = time.monotonic() + 30
+    while (status := client.get("/backups/status").json())["state"] == "running":
+        assert time.monotonic() < deadline, "backup did not finish"
+        time.sleep(0.05)
+    assert status["state"] == "done"
+    return status
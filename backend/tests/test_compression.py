@@ -0,0 +1,12 @@
+import os
+
+def test_backup_download_is_not_compressed_again(client, backup):
+    name = os.path.basename(backup["file"])
+    response = client.get(f"/backups/{name}", headers={"Accept-Encoding": "gzip, br"})
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert int(response.headers["content-length"]) == backup["size_bytes"] == len(response.content)
+
+def test_large_json_is_compressed(client):
+    response = client.get("/openapi.json", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
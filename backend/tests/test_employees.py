@@ -0,0 +1,13 @@
+def test_update_and_delete_report_missing_rows(client):
+    emp = client.post("/employees/new_employee", json={"emp_name": "Test Employee", "emp_work_percentage": 60, "emp_cash_percentage": 40}).json()
+
+    response = client.put("/employees/update_employee", json={**emp, "emp_phone": "555-0100"})
+    assert response.status_code == 200
+    assert response.json()["emp_phone"] == "555-0100"
+
+    response = client.delete(f"/employees/delete_employee/{emp['emp_id']}")
+    assert response.status_code == 200
+    assert response.json()["emp_id"] == emp["emp_id"]
+
+    assert client.put("/employees/update_employee", json=emp).status_code == 404
+    assert client.delete(f"/employees/delete_employee/{emp['emp_id']}").status_code == 404
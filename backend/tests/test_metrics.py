@@ -0,0 +1,10 @@
+def test_backup_duration_is_exported(client, backup):
+    body = client.get("/metrics").text
+    assert 'nails_db_backup_duration_seconds_count{trigger="manual"} 1' in body
+
+def test_normalize_statement_collapses_placeholder_lists():
+    from service.metrics import normalize_statement
+    assert normalize_statement("SELECT * FROM works WHERE work_id IN (?, ?, ?)") == "SELECT * FROM works WHERE work_id IN (?, ...)"
+    # archive.union_query binds the same parameters in both halves of the UNION by number
+    assert normalize_statement("SELECT * FROM works WHERE work_date BETWEEN ?1 AND ?2 UNION ALL SELECT * FROM archive.works WHERE work_id IN (?1, ?2,\n ?3)") \
+        == "SELECT * FROM works WHERE work_date BETWEEN ?1 AND ?2 UNION ALL SELECT * FROM archive.works WHERE work_id IN (?, ...)"
@@ -1,6 +1,6 @@
 // Function to load navbar component and set active nav item
 function loadNavbar(activePage) {
-    fetch('../navbar/navbar-component.html?v=3')
+    fetch('../navbar/navbar-component.html')
         .then(response => response.text())
         .then(html => {
             // Insert navbar at the beginning of the body
@@ -78,7 +78,7 @@ function loadNavbar(activePage) {
 
 // Function to load new work offcanvas component
 function loadNewWorkComponent(sourcePage) {
-    fetch('../newwork/newwork-offcanvas.html?v=1')
+    fetch('../newwork/newwork-offcanvas.html')
         .then(response => response.text())
         .then(html => {
             // Insert the component at the end of body
@@ -100,7 +100,7 @@ function loadNewWorkComponent(sourcePage) {
 
             // Load the JavaScript file for newwork component
             const script = document.createElement('script');
-            script.src = '../newwork/newwork-offcanvas.js?v=1';
+            script.src = '../newwork/newwork-offcanvas.js';
             script.type = 'text/javascript';
             script.onload = function() {
                 // Initialize the offcanvas after script loads
@@ -1,27 +1,184 @@
 #!/usr/bin/env python3
-"""Simple launcher for a static HTTP server to avoid running via -m http.server.
+"""Threaded static HTTP server for the frontend, with validators and cache headers.
 
-This avoids the RuntimeWarning that can occur when debugpy/runpy imports
-the package 'http' before executing the 'http.server' module.
+Every front-desk station keeps its own keep-alive connection, served on its own
+thread, so one slow tablet no longer blocks the others. Files are sent with a
+strong ETag (content hash) and Last-Modified, and conditional requests get
+304 Not Modified. Pages and scripts are sent with `Cache-Control: no-cache`: browsers
+keep them but revalidate on every load, so edits show up without `?v=` query strings.
+Content-hashed files (e.g. `app.3f2a9c1b.js`) never change and are cached as immutable.
+
+When a `.br` or `.gz` sibling of a file exists (see --precompress) and the client
+accepts that encoding, the compressed copy is sent instead.
+
+This launcher also avoids the RuntimeWarning that can occur when debugpy/runpy
+imports the package 'http' before executing the 'http.server' module.
 
 Usage: python run_http_server.py 8080
+       python run_http_server.py --precompress   # write .gz/.br copies, then serve
 """
+import argparse
+import gzip
+import hashlib
 import http.server
-import socketserver
-import sys
+import os
+import re
+import threading
+from email.utils import formatdate, parsedate_to_datetime
 
+# brotli is optional: without it only .gz copies are written
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
-def main():
-    port = 8000
-    if len(sys.argv) > 1:
+# name.<8+ hex digits>.ext, as written by bundlers that put a content hash in the file name
+HASHED_NAME = re.compile(r"\.[0-9a-f]{8,}\.[A-Za-z0-9]+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+COMPRESSIBLE = (".html", ".css", ".js", ".json", ".svg", ".txt")
+# Preferred first
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+_digests = {}
+_digests_lock = threading.Lock()
+
+def file_etag(path: str, st: os.stat_result) -> str:
+    key = (path, st.st_mtime_ns, st.st_size)
+    with _digests_lock:
+        etag = _digests.get(key)
+    if etag is None:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                digest.update(chunk)
+        etag = '"' + digest.hexdigest()[:32] + '"'
+        with _digests_lock:
+            _digests[key] = etag
+    return etag
+
+def accepted_encodings(header: str) -> set[str]:
+    encodings = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            encodings.add(coding.strip().lower())
+    return encodings
+
+
+class CachingRequestHandler(http.server.SimpleHTTPRequestHandler):
+    # HTTP/1.1 keeps connections open between requests; every response sets Content-Length
+    protocol_version = "HTTP/1.1"
+
+    def pick_variant(self, path: str, st: os.stat_result) -> tuple[str | None, str]:
+        accepted = accepted_encodings(self.headers.get("Accept-Encoding", ""))
+        for encoding, suffix in ENCODINGS:
+            if encoding in accepted:
+                try:
+                    # A copy older than its source is stale and ignored
+                    if os.stat(path + suffix).st_mtime_ns >= st.st_mtime_ns:
+                        return encoding, path + suffix
+                except OSError:
+                    pass
+        return None, path
+
+    def not_modified(self, etag: str, st: os.stat_result) -> bool:
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            return "*" in tags or etag in tags
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                return int(st.st_mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError, IndexError, OverflowError):
+                pass
+        return False
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            index = os.path.join(path, "index.html")
+            if not self.path.split("?", 1)[0].endswith("/") or not os.path.isfile(index):
+                # Redirect to the trailing slash, or list the directory
+                return super().send_head()
+            path = index
+        if path.endswith("/") or not os.path.isfile(path):
+            self.send_error(http.HTTPStatus.NOT_FOUND, "File not found")
+            return None
+
+        st = os.stat(path)
+        encoding, served = self.pick_variant(path, st)
+        served_st = os.stat(served) if served != path else st
+        etag = file_etag(served, served_st)
+        cache_control = IMMUTABLE if HASHED_NAME.search(path) else REVALIDATE
+
+        if self.not_modified(etag, st):
+            self.send_response(http.HTTPStatus.NOT_MODIFIED)
+            self.send_validators(etag, st, cache_control)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return None
+
+        f = open(served, "rb")
         try:
-            port = int(sys.argv[1])
-        except ValueError:
-            pass
+            self.send_response(http.HTTPStatus.OK)
+            self.send_header("Content-Type", self.guess_type(path))
+            if encoding:
+                self.send_header("Content-Encoding", encoding)
+            self.send_header("Content-Length", str(served_st.st_size))
+            self.send_validators(etag, st, cache_control)
+            self.end_headers()
+            return f
+        except Exception:
+            f.close()
+            raise
+
+    def send_validators(self, etag: str, st: os.stat_result, cache_control: str):
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", formatdate(st.st_mtime, usegmt=True))
+        self.send_header("Cache-Control", cache_control)
+        self.send_header("Vary", "Accept-Encoding")
+
+
+def precompress(directory: str) -> int:
+    """Write .gz (and .br, with brotli installed) copies of text assets that changed."""
+    written = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if not name.endswith(COMPRESSIBLE):
+                continue
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                data = f.read()
+            variants = [(".gz", lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+            if brotli is not None:
+                variants.append((".br", lambda d: brotli.compress(d, quality=11)))
+            for suffix, compress in variants:
+                target = path + suffix
+                if os.path.exists(target) and os.stat(target).st_mtime_ns >= os.stat(path).st_mtime_ns:
+                    continue
+                with open(target, "wb") as f:
+                    f.write(compress(data))
+                written += 1
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("port", nargs="?", type=int, default=8000)
+    parser.add_argument("--bind", default="", help="Address to listen on (default: all interfaces)")
+    parser.add_argument("--directory", default=os.getcwd(), help="Directory to serve (default: current directory)")
+    parser.add_argument("--precompress", action="store_true", help="Write .gz/.br copies of text assets before serving")
+    args = parser.parse_args()
+
+    if args.precompress:
+        print(f"Precompressed {precompress(args.directory)} files" + ("" if brotli else " (gzip only, pip install brotli for .br)"))
 
-    handler = http.server.SimpleHTTPRequestHandler
-    with socketserver.TCPServer(("", port), handler) as httpd:
-        print(f"Serving HTTP on port {port} (http://localhost:{port}/) ...")
+    handler = lambda *a, **kw: CachingRequestHandler(*a, directory=args.directory, **kw)
+    # One thread per connection; ThreadingHTTPServer's threads are daemons, so Ctrl+C still exits
+    with http.server.ThreadingHTTPServer((args.bind, args.port), handler) as httpd:
+        print(f"Serving HTTP on port {args.port} (http://localhost:{args.port}/) ...")
         try:
             httpd.serve_forever()
         except KeyboardInterrupt: